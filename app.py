@@ -3,17 +3,41 @@ import os
 import re
 import time
 import threading
+import queue
 import shutil
-import zlib
-from datetime import datetime
-from xml.etree import ElementTree as ET
-from flask import Flask, render_template, jsonify, request
+import hashlib
+import argparse
+import json
+import csv
+import io
+from collections import OrderedDict
+from flask import Flask, render_template, jsonify, request, Response
 from flask_cors import CORS
 import webbrowser
 import logging
 
 #custom packages
 import device_commands
+import flash_progress
+import status_events
+import flash_scheduler
+import process_utils
+import image_cache
+import image_format
+import probe_session
+import ccxml_template
+import probe_watcher
+import channel_registry
+import cluster
+import metrics
+import flash_failures
+import flash_timeline
+import production_records
+import retry_policy
+import image_snapshots
+import image_store
+import image_library
+import process_engine
 
 app = Flask(__name__)
 CORS(app)
@@ -48,9 +72,67 @@ OUT_FILE = os.path.join(IMAGE_DIR, "led_ex1_blinky_green.out")
 # 初始通道数量
 NUM_CHANNELS = 1
 
+# 加密密码文件（C2000加密烧录的-s参数）
+PASSWORD_FILE = "password.txt"
+
 # 最大烧录次数限制（默认3次）
 MAX_FLASH_COUNT = 3
 
+# 烧录前先校验目标芯片内容，与镜像一致时跳过擦除和写入（仅非加密模式）
+SKIP_IF_IDENTICAL = False
+
+# 常驻调试会话（试验功能）：每个烧录器保持一个长期连接的调试服务进程，省去每片重复的调试器配置和连接（仅非加密模式）
+# 尚无TI调试服务的协议适配程序，只能配合替身进程测试；DEBUG_SERVER_COMMAND为空时无法开启
+PERSISTENT_SESSION_ENABLED = False
+
+# 常驻调试服务启动命令（协议见probe_session.py），{ccxml} 替换为通道的ccxml文件
+# 本地测试可使用替身进程: ["python", os.path.join("sim", "fake_debug_server.py"), "{ccxml}"]
+DEBUG_SERVER_COMMAND = []
+
+# 烧录器热插拔监视的兜底扫描间隔（秒），0表示关闭自动监视
+PROBE_WATCH_INTERVAL = 5
+
+# 协调模式下的代理节点地址（也可通过命令行 --coordinator 指定），如 ["http://192.168.1.10:5001"]
+CLUSTER_AGENTS = []
+
+# 生产记录数据库（每次烧录一条记录，SQLite）
+RECORD_DB_PATH = r"production_records.db"
+
+# 烧录批次时间线存放目录（可导出为Chrome Trace）
+TIMELINE_DIR = r"timelines"
+
+# 镜像库索引文件（各镜像的大小、哈希、目标架构、段摘要等，按修改时间增量刷新）
+IMAGE_INDEX_PATH = r"image_index.json"
+
+# 镜像烧录统计的缓存时间（秒），避免每次打开文件列表都汇总全部生产记录
+IMAGE_STATS_TTL = 5.0
+
+# 代理模式下从协调节点接收的镜像存放目录（按SHA-256命名）
+AGENT_IMAGE_DIR = os.path.join(IMAGE_DIR, "agent_cache")
+
+# 镜像快照目录（排队时固定的只读镜像副本，有tmpfs时放在内存中）
+SNAPSHOT_DIR = image_snapshots.default_directory(os.path.join(IMAGE_DIR, "snapshots"))
+
+# MSP加密烧录的工厂复位时机：
+#   "on_locked" 先直接烧录，dslite报告芯片锁定时再工厂复位并重新烧录（全新芯片省去一次调试器启动和连接）
+#   "always"    每次烧录前都先工厂复位（芯片锁定时无法给出锁定提示的情况下使用）
+FACTORY_RESET_MODE = "on_locked"
+FACTORY_RESET_MODES = ("on_locked", "always")
+
+# MSP工厂复位与擦除、写入、校验合并为一次dslite调用（-b AutomaticFactoryReset），
+# 在同一次调试器启动和连接中完成；关闭时工厂复位单独调用一次dslite（noConnectFlash）
+# 默认关闭：合并方式需要先连接目标，锁定的MSPM0可能无法连接，尚未在实际硬件上验证
+COMBINED_FACTORY_RESET = False
+
+# 失败后按失败类别自动重试（规则见retry_policy.DEFAULT_RULES，可在前端关闭）
+AUTO_RETRY_ENABLED = True
+
+# 单机支持的最大通道数（烧录器数量）
+MAX_CHANNELS = 64
+
+# 同时运行的dslite进程数上限（USB集线器负载与吞吐之间的折中，可在前端调整）
+MAX_CONCURRENT_FLASHES = 4
+
 # ======================
 # 全局状态管理
 # ======================
@@ -62,45 +144,122 @@ TARGET_DEVICE_TYPE = "MSPM0G5187"  # 默认芯片型号，前端可修改
 # 母版ccxml文件路径（用于复制和修改）
 MASTER_CCXML_PATH = r"TMS320F28P550SJ9_LaunchPad.ccxml"
 
-# 各通道使用的ccxml文件（动态生成）
-CCXML_FILES = ["" for _ in range(8)]  # 索引0对应通道1，以此类推
-
-# 烧录状态：未开始、烧录中、烧录成功、烧录失败
-channel_status = {i: "未开始" for i in range(1, 9)}
-
-# 烧录计数
-success_count = {i: 0 for i in range(1, 9)}
-fail_count = {i: 0 for i in range(1, 9)}
+# 占用通道的状态（排队、烧录中或失败后等待自动重试）
+BUSY_STATUSES = ("排队中", "烧录中", "等待重试")
 
-# 烧录进程
-processes = {}
+# 通道注册表：每个通道一个状态对象，包含
+# 烧录状态（未开始、排队中、烧录中、等待重试、烧录成功、内容一致(已跳过)、烧录失败）、烧录计数、
+# 实时进度（由dslite输出流式解析）、ccxml文件、烧录器序列号、正在运行的dslite进程和终止标志
+channel_states = channel_registry.ChannelRegistry(
+    MAX_CHANNELS, BUSY_STATUSES,
+    lambda: flash_progress.ProgressParser().snapshot()
+)
 
 # 是否有烧录在进行中
 is_running = False
 
-# 设备序列号
+# 当前烧录批次号（时间线）
+current_lot_id = None
+
+# 设备序列号（在线烧录器，按通道号排序）
 device_serials = []
 
+# 序列号 -> 通道号（稳定映射：重新扫描或拔插不改变已分配的通道）
+serial_channel_map = {}
+
+# 通道号 -> 在线烧录器序列号
+channel_serials = {}
+
 # 线程锁
 status_lock = threading.Lock()
 
+# 烧录器扫描结果应用锁：热插拔监视线程与手动扫描互斥，序列号分配的计算与写入在同一次持锁中完成
+probe_apply_lock = threading.Lock()
+
+# 烧录命令缓存：(命令类型, 芯片型号, 镜像及其签名, 加密开关, ccxml, 密码文件签名) -> 命令参数元组
+command_cache = OrderedDict()
+command_cache_lock = threading.Lock()
+COMMAND_CACHE_SIZE = 64
+
+# 母版ccxml模板缓存与增量生成
+ccxml_generator = ccxml_template.CcxmlGenerator()
+
+# 镜像元数据缓存（CRC32、SHA-256等），文件变化后自动重新计算
+image_metadata_cache = image_cache.ImageMetadataCache(max_entries=32)
+
+# 状态推送广播器（/api/events）
+status_broadcaster = status_events.StatusBroadcaster()
+
+# SSE心跳间隔（秒）
+SSE_KEEPALIVE_INTERVAL = 15
+
+# 协调模式：汇总各代理节点
+cluster_coordinator = cluster.Coordinator(CLUSTER_AGENTS)
+
+# 子进程引擎：dslite/xdsdfu的启动、输出读取、超时以及重试延时都在同一个asyncio事件循环中处理
+flash_process_engine = process_engine.ProcessEngine()
+
+# 镜像快照（按内容寻址，所有通道共用）
+image_snapshot_store = image_snapshots.SnapshotStore(SNAPSHOT_DIR)
+
+# 失败自动重试策略
+flash_retry_policy = retry_policy.RetryPolicy(enabled=AUTO_RETRY_ENABLED)
+
+# 生产记录（后台线程批量写入）
+record_store = production_records.RecordStore(RECORD_DB_PATH)
+
+# 镜像库索引
+image_index = image_library.ImageLibrary(IMAGE_DIR, IMAGE_INDEX_PATH)
+_image_stats_cache = {"time": 0.0, "stats": {}}
+_image_stats_lock = threading.Lock()
+
+# 烧录批次时间线（每次从空闲状态开始排队时开始新批次）
+timeline_store = flash_timeline.FlashTimeline(TIMELINE_DIR)
+
+# 性能指标（/metrics），队列深度等瞬时值在抓取时计算
+metrics_registry = metrics.MetricsRegistry()
+flash_result_metric = metrics_registry.counter(
+    "uniflash_flash_results_total", "烧录结果计数（result: success/skipped/failure）",
+    ["channel", "result", "failure_class"]
+)
+flash_duration_metric = metrics_registry.histogram(
+    "uniflash_flash_duration_seconds", "单片烧录总耗时（秒，从开始烧录到得出结果）",
+    ["channel", "result"]
+)
+flash_phase_metric = metrics_registry.histogram(
+    "uniflash_flash_phase_duration_seconds", "dslite各阶段耗时（秒，step: factory_reset/precheck/burn/session）",
+    ["channel", "step", "phase"]
+)
+scan_duration_metric = metrics_registry.histogram(
+    "uniflash_probe_scan_duration_seconds", "烧录器扫描（xdsdfu -e）耗时（秒）",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
 # ======================
 # 初始化操作
 # ======================
 
 def init_generated_dir():
-    """初始化生成ccxml文件的目录"""
+    """初始化生成ccxml文件的目录（已有文件保留，扫描时按内容增量更新）"""
     if not os.path.exists(GENERATED_CCXML_DIR):
         os.makedirs(GENERATED_CCXML_DIR)
         app.logger.info(f"创建ccxml生成目录: {GENERATED_CCXML_DIR}")
-    else:
-        # 清理目录中已有的ccxml文件
-        for file in os.listdir(GENERATED_CCXML_DIR):
-            if file.endswith(".ccxml"):
-                try:
-                    os.remove(os.path.join(GENERATED_CCXML_DIR, file))
-                except Exception as e:
-                    app.logger.warning(f"清理旧ccxml文件失败: {str(e)}")
+
+def cleanup_generated_ccxml(keep_files):
+    """
+    清理不再被任何通道使用的生成ccxml文件
+    :param keep_files: 需要保留的文件路径集合
+    """
+    keep = {os.path.abspath(path) for path in keep_files if path}
+    for file in os.listdir(GENERATED_CCXML_DIR):
+        path = os.path.join(GENERATED_CCXML_DIR, file)
+        if not file.endswith(".ccxml") or os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+            ccxml_generator.forget(path)
+        except Exception as e:
+            app.logger.warning(f"清理旧ccxml文件失败: {str(e)}")
 
 # 初始化生成目录
 init_generated_dir()
@@ -115,21 +274,45 @@ if not os.path.exists(IMAGE_DIR):
 # ======================
 
 def calculate_file_crc32(file_path):
-    """计算文件的CRC32校验码"""
-    if not os.path.exists(file_path):
+    """计算文件的CRC32校验码（结果按路径、大小和修改时间缓存）"""
+    metadata = get_image_metadata(file_path)
+    if metadata is None:
+        return None
+    
+    # 返回8位十六进制字符串
+    return metadata["crc32"]
+
+def get_image_metadata(file_path):
+    """获取镜像文件元数据（CRC32、SHA-256、大小），文件不存在时返回None"""
+    metadata = image_metadata_cache.get(file_path)
+    if metadata is None:
         app.logger.error(f"文件不存在，无法计算CRC32: {file_path}")
+    return metadata
+
+def get_image_summary(metadata):
+    """镜像结构摘要（格式、目标架构、入口地址、写入字节数），无法解析时返回None"""
+    if not metadata or not metadata.get("image_info"):
         return None
+    return image_format.summarize(metadata["image_info"])
+
+def check_image_for_chip(file_path, chip_model):
+    """
+    校验镜像的目标架构是否与芯片型号匹配，避免连接烧录器后才失败
+    :return: (是否匹配, 消息)；无法解析的镜像（如.hex）不做拦截
+    """
+    metadata = get_image_metadata(file_path)
+    if metadata is None:
+        return False, f"烧录文件不存在: {file_path}"
     
-    crc = 0
-    with open(file_path, 'rb') as f:
-        while True:
-            data = f.read(65536)  # 64KB块读取
-            if not data:
-                break
-            crc = zlib.crc32(data, crc)
+    image_info = metadata.get("image_info")
+    expected = device_commands.get_chip_architecture(chip_model)
+    if not image_info or not image_info["architecture"] or not expected:
+        return True, ""
     
-    # 返回8位十六进制字符串
-    return f"{crc & 0xFFFFFFFF:08X}"
+    if image_info["architecture"] != expected:
+        return False, (f"烧录文件目标架构为 {image_info['machine_name']}，"
+                       f"与芯片 {chip_model}（{expected}）不匹配")
+    return True, ""
 
 # ======================
 # CCXML文件处理函数
@@ -147,52 +330,32 @@ def get_ccxml_file(chip_model: str) -> str:
         )
     return CHIP_CCXML_MAP[chip_model]
 
-def create_ccxml_with_serial(channel, serial):
+def create_ccxml_with_serial(channel, serial, master_path=None):
     """
-    根据母版ccxml文件创建带有指定序列号的新文件（文本替换版）
+    根据母版ccxml模板生成带有指定序列号的文件（内容未变化时不重写）
+    :param master_path: 母版ccxml路径，为None时使用整站设置（MASTER_CCXML_PATH）
     """
-    app.logger.info(f"创建烧录器系列号CCXML")
-    if not os.path.exists(MASTER_CCXML_PATH):
-        return False, f"母版ccxml文件不存在: {MASTER_CCXML_PATH}"
+    master_path = master_path or MASTER_CCXML_PATH
+    if not os.path.exists(master_path):
+        return False, f"母版ccxml文件不存在: {master_path}"
     
     new_filename = f"channel_{channel}_serial_{serial}.ccxml"
     new_filepath = os.path.join(GENERATED_CCXML_DIR, new_filename)
     
     try:
-        # 读取母版文件内容
-        with open(MASTER_CCXML_PATH, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 正则匹配模式：匹配 id="-- Enter the serial number" 对应的 Value 属性
-        pattern = r'(Value=["\']).*?(["\']\s+id=["\']-- Enter the serial number["\'])'
-        
-        # 执行替换
-        new_content, replace_count = re.subn(
-            pattern,
-            lambda m: f'{m.group(1)}{serial}{m.group(2)}',
-            content
-        )
-        
-        if replace_count == 0:
-            return False, "未找到需要替换的序列号位置（id=\"-- Enter the serial number\"）"
-        
-        # 写入新文件
-        with open(new_filepath, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
-        app.logger.info(f"已生成通道 {channel} 的ccxml文件: {new_filepath} (序列号: {serial})")
+        written = ccxml_generator.generate(master_path, serial, new_filepath)
+        if written:
+            app.logger.info(f"已生成通道 {channel} 的ccxml文件: {new_filepath} (序列号: {serial})")
         return True, new_filepath
         
     except Exception as e:
-        if os.path.exists(new_filepath):
-            os.remove(new_filepath)
         return False, f"生成ccxml文件失败: {str(e)}"
 
 # ======================
 # 密码相关函数
 # ======================
 
-def read_encryption_passwords(file_path="password.txt"):
+def read_encryption_passwords(file_path=PASSWORD_FILE):
     """读取加密密码文件中的8个-s参数值"""
     try:
         with open(file_path, 'r') as f:
@@ -237,14 +400,56 @@ def _check_success_flag(output_file):
         app.logger.error(f"检查成功标志时发生错误: {str(e)}")
         return False
 
-def generate_factoryreset_command(ccxml_file, is_encryption_enabled=True):
+def _file_signature(file_path):
+    """文件签名（大小、修改时间），文件不存在时返回None"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
 
-    series = device_commands.get_chip_series(TARGET_DEVICE_TYPE)
+def _get_cached_command(kind, ccxml_file, is_encryption_enabled, builder, image=None, chip_type=None):
+    """
+    按 (命令类型, 芯片型号, 镜像, 加密开关, ccxml) 缓存命令参数；镜像或密码文件变化后自动重新生成
+    :param builder: 生成命令参数列表的函数
+    :param image: 镜像路径，为None时使用整站设置（OUT_FILE）
+    :param chip_type: 芯片型号，为None时使用整站设置（TARGET_DEVICE_TYPE）
+    :return: 命令参数元组（不经过shell执行）
+    """
+    image = image or OUT_FILE
+    key = (
+        kind,
+        chip_type or TARGET_DEVICE_TYPE,
+        DSLITE_PATH,
+        image,
+        _file_signature(image),
+        bool(is_encryption_enabled),
+        ccxml_file,
+        _file_signature(PASSWORD_FILE) if is_encryption_enabled else None
+    )
+    with command_cache_lock:
+        cmd = command_cache.get(key)
+        if cmd is not None:
+            command_cache.move_to_end(key)
+            return cmd
+    
+    cmd = tuple(builder())
+    with command_cache_lock:
+        command_cache[key] = cmd
+        while len(command_cache) > COMMAND_CACHE_SIZE:
+            command_cache.popitem(last=False)
+    return cmd
+
+def format_command(cmd):
+    """命令参数转为便于日志阅读的字符串"""
+    return subprocess.list2cmdline(cmd)
+
+def _build_factoryreset_command(ccxml_file, is_encryption_enabled, chip_type=None):
+    series = device_commands.get_chip_series(chip_type or TARGET_DEVICE_TYPE)
     command_parts = []
     # 如果开启加密，添加额外参数
     if is_encryption_enabled: 
         if series == "MSP":
-            app.logger.warning(f"正在工厂复位MSP系列芯片")
             command_parts = [
                 DSLITE_PATH,
                 "noConnectFlash",
@@ -258,286 +463,957 @@ def generate_factoryreset_command(ccxml_file, is_encryption_enabled=True):
     else:
         pass
 
-    return ' '.join(command_parts)
+    return command_parts
 
+def generate_factoryreset_command(ccxml_file, is_encryption_enabled=True, chip_type=None):
+    """
+    生成工厂复位命令（仅MSP系列加密烧录时需要）
+    :param chip_type: 芯片型号，为None时使用整站设置
+    :return: 命令参数元组，不需要复位时为空元组
+    """
+    return _get_cached_command(
+        "factoryreset", ccxml_file, is_encryption_enabled,
+        lambda: _build_factoryreset_command(ccxml_file, is_encryption_enabled, chip_type),
+        chip_type=chip_type
+    )
 
-def generate_burn_command(ccxml_file, is_encryption_enabled=True):
+def generate_verify_command(ccxml_file, image=None):
     """
-    生成烧录命令
-    :param config_file: 配置文件路径
-    :param settings_file: 设置文件路径
-    :param is_encryption_enabled: 加密开关状态
-    :return: 完整烧录命令字符串
+    生成只校验不烧录的命令：dslite读取目标芯片中镜像各段所在区域并与镜像内容逐段比较
+    :param ccxml_file: 配置文件路径
+    :param image: 镜像路径，为None时使用整站设置
+    :return: 命令参数元组
     """
+    image = image or OUT_FILE
+    return _get_cached_command(
+        "verify", ccxml_file, False,
+        lambda: [DSLITE_PATH, "flash", "-c", ccxml_file, "-v", image],
+        image=image
+    )
+
+def _check_verify_passed(output_file):
+    """检查校验输出，判断目标芯片内容是否与镜像一致"""
+    try:
+        with open(output_file, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read().lower()
+        return "verification successful" in content and _check_success_flag(output_file)
+    except Exception as e:
+        app.logger.error(f"检查校验结果时发生错误: {str(e)}")
+        return False
+
+def _build_burn_command(ccxml_file, is_encryption_enabled, factory_reset=False, image=None, chip_type=None):
+    image = image or OUT_FILE
+    chip_type = chip_type or TARGET_DEVICE_TYPE
+    
     # 获取芯片系列
-    series = device_commands.get_chip_series(TARGET_DEVICE_TYPE)
+    series = device_commands.get_chip_series(chip_type)
     
     # 基础命令部分
-    if series == "C2000":
-        command_parts = [
-            DSLITE_PATH,
-            "flash",
-            "-c", ccxml_file,
-            "-e", "-f", "-v",
-            OUT_FILE
-        ]
-    elif series == "MSP":
-        command_parts = [
-            DSLITE_PATH,
-            "flash",
-            "-c", ccxml_file,
-            "-e", "-f", "-v",
-            OUT_FILE
-        ]
-    else:
-        command_parts = [
-            DSLITE_PATH,
-            "flash",
-            "-c", ccxml_file,
-            "-e", "-f", "-v",
-            OUT_FILE
-        ]
-            
-
+    command_parts = [
+        DSLITE_PATH,
+        "flash",
+        "-c", ccxml_file,
+        "-e", "-f", "-v",
+        image
+    ]
     
-    # 如果开启加密，添加额外参数
+    # 如果开启加密，添加额外参数（每个选项与取值作为独立参数传递，无需shell引号）
     if is_encryption_enabled:
         if series == "C2000":
-        # 添加固定的-a参数
-            command_parts.append("-s VerifyAfterProgramLoad=\"No verification\"")
-            command_parts.append("-s FlashResetOnOperation=false")
-            
-            command_parts.append("-b Z1Unlock")
-            # command_parts.append("-b Z1AllProgram")
-            command_parts.append("-a Z1Unlock")
-            command_parts.append("-a Z1PasswordProgram")
-            command_parts.append("-a Z1GRABEXEONLYProgram")
+            # 添加固定的-a参数
+            command_parts += ["-s", "VerifyAfterProgramLoad=No verification"]
+            command_parts += ["-s", "FlashResetOnOperation=false"]
             
+            command_parts += ["-b", "Z1Unlock"]
+            # command_parts += ["-b", "Z1AllProgram"]
+            command_parts += ["-a", "Z1Unlock"]
+            command_parts += ["-a", "Z1PasswordProgram"]
+            command_parts += ["-a", "Z1GRABEXEONLYProgram"]
             
             # 读取并添加-s参数
-            encryption_params = read_encryption_passwords()
+            encryption_params = read_encryption_passwords(PASSWORD_FILE)
             for param in encryption_params:
-                command_parts.append(f"-s {param}")
+                command_parts += ["-s", param]
 
         elif series == "MSP":
-            app.logger.warning(f"正在加密烧录MSP系列芯片")
             command_parts = [
-                # DSLITE_PATH,
-                # "flash",
-                # "-c", ccxml_file,
-                # "-O",
-                # "AutomaticFactoryReset",
-                # "\n"
                 DSLITE_PATH,
                 "flash",
                 "-c", ccxml_file,
                 "-e", "-f", "-v",
-                "-s FlashEraseSelection=\"Erase MAIN and NONMAIN necessary sectors only (see warning above)\"",
-                OUT_FILE
+                "-s", "FlashEraseSelection=Erase MAIN and NONMAIN necessary sectors only (see warning above)",
+                image
             ]
 
-         
-
         else:
-            app.logger.warning(f"未知的芯片系列，无法添加加密参数: {TARGET_DEVICE_TYPE}")
+            app.logger.warning(f"未知的芯片系列，无法添加加密参数: {chip_type}")
+    
+    # 工厂复位作为加载前操作，与擦除、写入、校验在同一次连接中完成（仅MSP系列）
+    if factory_reset and series == "MSP":
+        command_parts[-1:-1] = ["-b", "AutomaticFactoryReset"]
+    
+    return command_parts
+
+def generate_burn_command(ccxml_file, is_encryption_enabled=True, factory_reset=False, image=None, chip_type=None):
+    """
+    生成烧录命令
+    :param ccxml_file: 配置文件路径
+    :param is_encryption_enabled: 加密开关状态
+    :param factory_reset: 是否在烧录前先执行工厂复位（同一次dslite调用，仅MSP系列）
+    :param image: 镜像路径，为None时使用整站设置
+    :param chip_type: 芯片型号，为None时使用整站设置
+    :return: 命令参数元组（按芯片、镜像、加密开关和ccxml缓存）
+    """
+    return _get_cached_command(
+        "burn_reset" if factory_reset else "burn", ccxml_file, is_encryption_enabled,
+        lambda: _build_burn_command(ccxml_file, is_encryption_enabled, factory_reset, image, chip_type),
+        image=image, chip_type=chip_type
+    )
+
+def _channel_target(state):
+    """
+    通道的烧录目标：未单独分配的项使用整站设置（需在持有status_lock时调用）
+    :return: (镜像路径, 芯片型号, 母版ccxml路径)
+    """
+    chip_type = state.chip_type or TARGET_DEVICE_TYPE
+    if state.master_ccxml:
+        master = state.master_ccxml
+    elif state.chip_type:
+        master = CHIP_CCXML_MAP.get(chip_type, MASTER_CCXML_PATH)
+    else:
+        master = MASTER_CCXML_PATH
+    return state.image or OUT_FILE, chip_type, master
+
+def _is_any_busy():
+    """是否还有排队或烧录中的通道（需在持有status_lock时调用）"""
+    return channel_states.any_busy
+
+def _build_target_summary(state):
+    """通道单独分配的烧录目标（需在持有status_lock时调用），未单独分配时返回None"""
+    if not (state.image or state.chip_type or state.master_ccxml):
+        return None
+    image, chip_type, master = _channel_target(state)
+    return {"image": os.path.basename(image), "chip_type": chip_type, "master_ccxml": master}
+
+def _build_channel_event(channel):
+    """构建单个通道的推送数据（需在持有status_lock时调用）"""
+    state = channel_states.get(channel)
+    return {
+        "channel": channel,
+        "status": state.status,
+        "success": state.success,
+        "fail": state.fail,
+        "progress": state.progress,
+        "target": _build_target_summary(state),
+        "is_running": is_running,
+        "total_success": channel_states.total_success,
+        "total_fail": channel_states.total_fail,
+        "version": channel_states.version
+    }
+
+def _notify_channel(channel):
+    """推送通道状态变化"""
+    with status_lock:
+        data = _build_channel_event(channel)
+    status_broadcaster.publish("channel", data)
+
+def _notify_status():
+    """推送全量状态（计数重置、扫描等影响多个通道的变化）"""
+    with status_lock:
+        data = _build_status()
+    status_broadcaster.publish("snapshot", data)
+
+def _update_progress(channel, snapshot):
+    """更新通道的实时进度（记录更新时间，便于区分卡住与缓慢的烧录器）"""
+    snapshot["updated_at"] = time.time()
+    with status_lock:
+        channel_states.set_progress(channel, snapshot)
+    _notify_channel(channel)
+
+def _record_step(channel, step, parser, step_started):
+    """
+    记录一次dslite运行（步骤）的各阶段耗时指标与时间线
+    :param step_started: 步骤开始时的time.time()
+    """
+    parser.finish()
+    for phase, seconds in parser.phase_durations().items():
+        flash_phase_metric.observe(seconds, channel, step, phase)
+    with status_lock:
+        channel_states.get(channel).run_steps.append({
+            "step": step,
+            "start": step_started,
+            "end": time.time(),
+            "phases": [list(span) for span in parser.spans]
+        })
+
+def _record_flash_result(channel, started, failure_class=None, skipped=False, return_code=None,
+                         retrying=False, message=None):
+    """
+    记录一次烧录的结果：总耗时指标、批次时间线与生产记录
+    :param started: 开始烧录时的time.monotonic()
+    :param failure_class: 失败类别（见flash_failures），成功时为None
+    :param skipped: 是否因内容一致跳过烧录
+    :param return_code: dslite返回码
+    :param retrying: 失败后将自动重试（结果记为retry，不计入失败）
+    :param message: 结果说明，为None时使用通道当前状态
+    """
+    if retrying:
+        result = "retry"
+    else:
+        result = "skipped" if skipped else ("success" if failure_class is None else "failure")
+    elapsed = time.monotonic() - started
+    flash_result_metric.inc(channel, result, failure_class or "")
+    flash_duration_metric.observe(elapsed, channel, result)
+    
+    end = time.time()
+    with status_lock:
+        state = channel_states.get(channel)
+        lot_id, queued_at, steps = state.lot_id, state.queued_at, state.run_steps
+        state.run_steps = []
+        serial, message = state.serial, message or state.status
+        image, chip_type, _ = _channel_target(state)
+        snapshot = state.snapshot
+    
+    # 各步骤的阶段耗时 {步骤: {阶段: 秒}}
+    phase_durations = {}
+    for step in steps:
+        durations = phase_durations.setdefault(step["step"], {})
+        for phase, start, stop in step["phases"]:
+            durations[phase] = round(durations.get(phase, 0) + ((stop or step["end"]) - start), 3)
+    
+    # 记录实际烧录的快照内容
+    if snapshot is not None:
+        image, image_sha256 = snapshot.source, snapshot.sha256
+    else:
+        image_sha256 = (image_metadata_cache.get(image) or {}).get("sha256")
+    record_store.add({
+        "timestamp": end,
+        "lot_id": lot_id,
+        "channel": channel,
+        "serial": serial,
+        "chip_type": chip_type,
+        "image": os.path.basename(image),
+        "image_sha256": image_sha256,
+        "result": result,
+        "failure_class": failure_class,
+        "return_code": return_code,
+        "duration": round(elapsed, 3),
+        "phase_durations": phase_durations,
+        "message": message
+    })
+    
+    if lot_id is not None:
+        timeline_store.add_run(lot_id, channel, {
+            "queued": queued_at,
+            "start": end - elapsed,
+            "end": end,
+            "result": result,
+            "failure_class": failure_class,
+            "steps": steps
+        })
+
+def _stream_dslite_output(channel, cmd, output_file, timeout, step="burn"):
+    """
+    启动dslite并逐行读取输出：写入通道输出文件，同时解析阶段与进度
+    :param channel: 通道号
+    :param cmd: 烧录命令参数（列表或元组，不经过shell）
+    :param output_file: 输出文件路径
+    :param timeout: 超时时间（秒），超时后由子进程引擎结束进程树并抛出TimeoutExpired
+    :param step: 烧录步骤（factory_reset/precheck/burn），用于阶段耗时指标
+    :return: dslite返回码（被终止时非0）
+    """
+    step_started = time.time()
+    parser = flash_progress.ProgressParser()
+    _update_progress(channel, parser.snapshot())
+    processes = []
+    
+    # 登记进程句柄；登记前已请求终止则立即结束
+    def on_start(process):
+        processes.append(process)
+        with status_lock:
+            state = channel_states.get(channel)
+            state.process = process
+            cancel_event = state.cancel_event
+        if cancel_event is not None and cancel_event.is_set():
+            process_utils.kill_process_tree(process)
+    
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            def on_line(line):
+                f.write(line)
+                f.flush()
+                if parser.feed(line):
+                    _update_progress(channel, parser.snapshot())
             
+            return flash_process_engine.run(cmd, timeout, on_start=on_start, on_line=on_line)
+    finally:
+        _record_step(channel, step, parser, step_started)
+        with status_lock:
+            state = channel_states.get(channel)
+            if processes and state.process is processes[0]:
+                state.process = None
+
+def _build_debug_server_argv(ccxml_file):
+    """生成常驻调试服务的启动参数"""
+    return [part.replace("{ccxml}", ccxml_file) for part in DEBUG_SERVER_COMMAND]
+
+def _run_session_flash(channel, ccxml_file, output_file, cancel_event, image):
+    """
+    通过常驻调试会话执行擦除、写入和校验
+    :return: 是否成功
+    :raises probe_session.SessionError: 会话启动失败、退出或超时
+    """
+    step_started = time.time()
+    parser = flash_progress.ProgressParser()
+    _update_progress(channel, parser.snapshot())
+    
+    # 登记会话进程，停止时结束整个会话（下次使用时自动重建）；
+    # 新建会话时在等待就绪前登记，启动过程中也能终止
+    registered = []
+    def register(process):
+        registered.append(process)
+        with status_lock:
+            channel_states.get(channel).process = process
+        if cancel_event.is_set():
+            process_utils.kill_process_tree(process)
     
-    # 拼接成完整命令
-    return ' '.join(command_parts)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        def on_line(line):
+            f.write(line)
+            f.flush()
+            if parser.feed(line):
+                _update_progress(channel, parser.snapshot())
+        
+        try:
+            session = probe_sessions.get(channel, ccxml_file, on_line=on_line, on_spawn=register)
+            if not registered:
+                register(session.process)
+            ok, message = session.run(
+                "program", image,
+                options={"erase": True, "verify": True},
+                timeout=300,
+                on_line=on_line
+            )
+        finally:
+            _record_step(channel, "session", parser, step_started)
+            with status_lock:
+                state = channel_states.get(channel)
+                if registered and state.process is registered[-1]:
+                    state.process = None
+    
+    if not ok:
+        app.logger.error(f"通道 {channel} 会话烧录失败: {message}")
+    return ok
 
 def _run_dslite(channel, encryption_enabled):
     """运行单个通道的烧录进程"""
-    global is_running, channel_status, success_count, fail_count
+    global is_running
+    
+    # 排队期间已被停止的任务不再执行；检查与切换为烧录中在同一次持锁中完成，
+    # 之后的终止请求都会设置cancel_event
+    cancel_event = threading.Event()
+    with status_lock:
+        state = channel_states.get(channel)
+        if state.status != "排队中":
+            return
+        channel_states.set_status(channel, "烧录中")
+        is_running = True
+        state.cancel_event = cancel_event
+        state.run_steps = []
+        ccxml_file = state.ccxml_file
+        image, chip_type, _ = _channel_target(state)
+        # 使用排队时固定的镜像快照，运行中切换或重新上传镜像不影响本通道
+        if state.snapshot is not None:
+            image = state.snapshot.path
+        force_factory_reset = state.retry_reset
+        state.retry_reset = False
+    started = time.monotonic()
+    _notify_channel(channel)
     
     # 检查通道对应的ccxml文件是否存在
-    ccxml_file = CCXML_FILES[channel - 1]  # CCXML_FILES索引0对应通道1
     if not ccxml_file or not os.path.exists(ccxml_file):
         with status_lock:
-            channel_status[channel] = "配置错误: 未找到ccxml文件"
+            channel_states.set_status(channel, "配置错误: 未找到ccxml文件")
+            state.cancel_event = None
+            is_running = _is_any_busy()
+        _record_flash_result(channel, started, "config")
+        _notify_channel(channel)
         app.logger.error(f"通道 {channel} 未找到ccxml文件: {ccxml_file}")
         return
     
     output_file = f"flash_channel_{channel}.txt"
     
     try:
-        # 更新状态
-        with status_lock:
-            channel_status[channel] = "烧录中"
-            is_running = True
+        # 构建工厂复位命令（加密烧录或芯片锁定后重试时需要）
+        factory_reset_cmd = generate_factoryreset_command(ccxml_file, encryption_enabled or force_factory_reset, chip_type)
+        # 仅锁定时复位：先直接烧录，报告锁定后再复位（重试时已确认锁定，直接复位）
+        reset_on_locked = bool(factory_reset_cmd) and not force_factory_reset and FACTORY_RESET_MODE == "on_locked"
+        # 合并模式下工厂复位作为烧录命令的前置操作，不再单独启动dslite
+        combined_reset = bool(factory_reset_cmd) and not reset_on_locked and COMBINED_FACTORY_RESET
+        if factory_reset_cmd and not reset_on_locked and not combined_reset:
+            app.logger.info(f"通道 {channel} 执行工厂复位命令: {format_command(factory_reset_cmd)}")
+            _stream_dslite_output(channel, factory_reset_cmd, output_file, timeout=120, step="factory_reset")
         
+        if cancel_event.is_set():
+            _finish_cancelled(channel, started)
+            return
         
-        # 构建工厂复位命令（如果需要）
-        factory_reset_cmd = generate_factoryreset_command(ccxml_file, encryption_enabled)
-        if(len(factory_reset_cmd) > 0):
-            app.logger.info(f"通道 {channel} 执行工厂复位命令: {factory_reset_cmd}")
-            subprocess.run(factory_reset_cmd, shell=True, timeout=120)
+        # 预检查：目标芯片内容与镜像一致时跳过擦除和写入
+        # 加密模式下芯片处于锁定状态无法读取，且MSP可能需要工厂复位，因此不做预检查
+        if SKIP_IF_IDENTICAL and not encryption_enabled:
+            verify_cmd = generate_verify_command(ccxml_file, image)
+            app.logger.info(f"通道 {channel} 执行预校验命令: {format_command(verify_cmd)}")
+            _stream_dslite_output(channel, verify_cmd, output_file, timeout=120, step="precheck")
+            
+            if cancel_event.is_set():
+                _finish_cancelled(channel, started)
+                return
+            
+            if _check_verify_passed(output_file):
+                app.logger.info(f"通道 {channel} 芯片内容与镜像一致，跳过烧录")
+                with status_lock:
+                    channel_states.set_status(channel, "内容一致(已跳过)")
+                    channel_states.count_success(channel)
+                    is_running = _is_any_busy()
+                _record_flash_result(channel, started, skipped=True)
+                _notify_channel(channel)
+                return
+        
+        # 常驻调试会话模式：在已连接的会话中完成擦除、写入和校验
+        if PERSISTENT_SESSION_ENABLED and DEBUG_SERVER_COMMAND and not encryption_enabled and not combined_reset:
+            app.logger.info(f"通道 {channel} 使用常驻调试会话烧录")
+            success = _run_session_flash(channel, ccxml_file, output_file, cancel_event, image)
+            
+            if cancel_event.is_set():
+                _finish_cancelled(channel, started)
+                return
+            
+            if not success:
+                _finish_failed(channel, started, encryption_enabled, "烧录失败 (调试会话)", "session")
+                return
+            with status_lock:
+                channel_states.set_status(channel, "烧录成功")
+                channel_states.count_success(channel)
+                is_running = _is_any_busy()
+            _record_flash_result(channel, started)
+            _notify_channel(channel)
+            return
         
         # 构建烧录命令
-        cmd = generate_burn_command(ccxml_file, encryption_enabled)
+        cmd = generate_burn_command(ccxml_file, encryption_enabled, combined_reset, image, chip_type)
         
-        app.logger.info(f"通道 {channel} 执行命令: {cmd}")
+        app.logger.info(f"通道 {channel} 执行命令: {format_command(cmd)}")
         
-        # 执行命令
-        start_time = datetime.now()
-        with open(output_file, 'w', encoding='utf-8') as f:
-            process = subprocess.run(
-                cmd,
-                stdout=f,
-                stderr=subprocess.STDOUT,
-                text=True,
-                timeout=300  # 5分钟超时
-            )
+        # 执行命令（实时读取输出并解析进度）
+        # 5分钟超时，合并工厂复位时加上复位的2分钟
+        return_code = _stream_dslite_output(channel, cmd, output_file, timeout=420 if combined_reset else 300)
         
-        # 检查结果
-        success = _check_success_flag(output_file)
-        duration = (datetime.now() - start_time).total_seconds()
+        if cancel_event.is_set():
+            _finish_cancelled(channel, started)
+            return
+        
+        # 芯片已锁定：工厂复位后重新烧录
+        if (reset_on_locked and not _check_success_flag(output_file)
+                and flash_failures.classify_file(output_file) == "device_locked"):
+            if COMBINED_FACTORY_RESET:
+                cmd = generate_burn_command(ccxml_file, encryption_enabled, True, image, chip_type)
+                app.logger.info(f"通道 {channel} 芯片已锁定，执行工厂复位+烧录命令: {format_command(cmd)}")
+            else:
+                app.logger.info(f"通道 {channel} 芯片已锁定，执行工厂复位命令: {format_command(factory_reset_cmd)}")
+                _stream_dslite_output(channel, factory_reset_cmd, output_file, timeout=120, step="factory_reset")
+                if cancel_event.is_set():
+                    _finish_cancelled(channel, started)
+                    return
+            
+            return_code = _stream_dslite_output(channel, cmd, output_file, timeout=420 if COMBINED_FACTORY_RESET else 300)
+            if cancel_event.is_set():
+                _finish_cancelled(channel, started)
+                return
+        
+        # 检查结果，失败时按失败类别判断是否自动重试
+        if not _check_success_flag(output_file):
+            _finish_failed(
+                channel, started, encryption_enabled,
+                f"烧录失败 (返回码: {return_code})",
+                flash_failures.classify_file(output_file),
+                return_code=return_code
+            )
+            return
         
         # 更新状态和计数
         with status_lock:
-            if success:
-                channel_status[channel] = "烧录成功"
-                success_count[channel] += 1
-            else:
-                channel_status[channel] = f"烧录失败 (返回码: {process.returncode})"
-                fail_count[channel] += 1
+            channel_states.set_status(channel, "烧录成功")
+            channel_states.count_success(channel)
             
             # 检查是否还有运行中的通道
-            is_running = any(status == "烧录中" for status in channel_status.values())
+            is_running = _is_any_busy()
+        _record_flash_result(channel, started, return_code=return_code)
+        _notify_channel(channel)
             
     except Exception as e:
+        if cancel_event.is_set():
+            _finish_cancelled(channel, started)
+            return
         app.logger.error(f"通道 {channel} 烧录错误: {str(e)}")
+        if isinstance(e, subprocess.TimeoutExpired):
+            failure_class = "timeout"
+        elif isinstance(e, probe_session.SessionError):
+            failure_class = "session"
+        else:
+            failure_class = flash_failures.classify_file(output_file)
+        _finish_failed(channel, started, encryption_enabled, f"烧录错误: {str(e)}", failure_class)
+    finally:
         with status_lock:
-            channel_status[channel] = f"烧录错误: {str(e)}"
-            fail_count[channel] += 1
-            is_running = any(status == "烧录中" for status in channel_status.values())
+            state = channel_states.get(channel)
+            if state.cancel_event is cancel_event:
+                state.cancel_event = None
+
+def _finish_failed(channel, started, encryption_enabled, message, failure_class, return_code=None):
+    """
+    记录失败的烧录；失败类别符合重试策略时进入等待重试状态（不计入失败），到时重新排队
+    :param message: 不再重试时显示的失败状态
+    :param failure_class: 失败类别（见flash_failures）
+    """
+    global is_running
+    with status_lock:
+        state = channel_states.get(channel)
+        can_factory_reset = device_commands.get_chip_series(_channel_target(state)[1]) == "MSP"
+        decision = flash_retry_policy.decide(failure_class, state.retry_count, can_factory_reset)
+        if decision is None:
+            channel_states.set_status(channel, message)
+            channel_states.count_fail(channel)
+        else:
+            state.retry_count = decision.attempt
+            state.retry_reset = decision.factory_reset
+            channel_states.set_status(channel, "等待重试")
+            state.retry_timer = flash_process_engine.call_later(
+                decision.delay, _resubmit_retry, channel, encryption_enabled)
+        is_running = _is_any_busy()
+    
+    if decision is not None:
+        app.logger.warning(
+            f"通道 {channel} {message}（{flash_failures.get_failure_label(failure_class)}），"
+            f"{decision.delay:.1f}秒后第{decision.attempt}次重试{'（先执行工厂复位）' if decision.factory_reset else ''}"
+        )
+    _record_flash_result(channel, started, failure_class, return_code=return_code,
+                         retrying=decision is not None, message=message)
+    _notify_channel(channel)
+
+def _resubmit_retry(channel, encryption_enabled):
+    """等待结束后将通道重新加入烧录队列（等待期间被终止则不再重试）"""
+    global is_running
+    with status_lock:
+        state = channel_states.get(channel)
+        if state.status != "等待重试":
+            return
+        state.retry_timer = None
+        submitted = flash_scheduler_pool.submit(channel, encryption_enabled)
+        if submitted:
+            channel_states.set_status(channel, "排队中")
+            state.queued_at = time.time()
+        else:
+            channel_states.set_status(channel, "烧录失败 (重试提交失败)")
+            channel_states.count_fail(channel)
+            is_running = _is_any_busy()
+    if not submitted:
+        app.logger.error(f"通道 {channel} 重试任务提交失败")
+    _notify_channel(channel)
+
+def _finish_cancelled(channel, started):
+    """记录被终止的烧录"""
+    global is_running
+    app.logger.warning(f"通道 {channel} 烧录已终止")
+    with status_lock:
+        channel_states.set_status(channel, "烧录终止")
+        channel_states.count_fail(channel)
+        is_running = _is_any_busy()
+    _record_flash_result(channel, started, "cancelled")
+    _notify_channel(channel)
+
+def stop_channel(channel):
+    """
+    终止单个通道：排队中的任务直接取消，运行中的任务结束其dslite进程树
+    :return: (是否成功, 消息)
+    """
+    global is_running
+    
+    cancelled = flash_scheduler_pool.cancel_pending(channel)
+    process = None
+    retry_stopped = False
+    with status_lock:
+        state = channel_states.get(channel)
+        if state.retry_timer is not None:
+            state.retry_timer.cancel()
+            state.retry_timer = None
+        if state.status == "等待重试":
+            # 等待重试的通道上一次已失败，终止后计入失败
+            channel_states.set_status(channel, "烧录终止")
+            channel_states.count_fail(channel)
+            retry_stopped = True
+        elif cancelled or state.status == "排队中":
+            channel_states.set_status(channel, "未开始")
+        elif state.status == "烧录中":
+            process = state.process
+        else:
+            return False, f"通道 {channel} 未在烧录"
+        # 无论当前状态如何，已取得任务的工作线程都会看到终止请求
+        if state.cancel_event is not None:
+            state.cancel_event.set()
+        is_running = _is_any_busy()
+    
+    if retry_stopped:
+        _record_flash_result(channel, time.monotonic(), "cancelled")
+    
+    # 结束进程树后由烧录线程记录终止状态
+    process_utils.kill_process_tree(process)
+    _notify_channel(channel)
+    return True, f"通道 {channel} 烧录已终止"
+
+def _enqueue_channel(channel, encryption_enabled, snapshot=None):
+    """
+    将通道加入烧录队列（需在持有status_lock时调用）
+    :param snapshot: 本次烧录使用的镜像快照（重试时沿用）
+    """
+    global is_running, current_lot_id
+    
+    if not flash_scheduler_pool.submit(channel, encryption_enabled):
+        return False
+    
+    # 从空闲状态开始排队时开始新批次
+    if current_lot_id is None or not channel_states.any_busy:
+        current_lot_id = timeline_store.begin_lot(os.path.basename(OUT_FILE))
+    state = channel_states.set_status(channel, "排队中")
+    state.lot_id = current_lot_id
+    state.queued_at = time.time()
+    state.retry_count = 0
+    state.retry_reset = False
+    state.snapshot = snapshot
+    is_running = True
+    return True
+
+def _pin_snapshots(channels):
+    """
+    为即将排队的通道固定镜像快照，并检查快照与芯片是否匹配（相同镜像只复制一次）
+    :return: (通道号 -> 快照, 错误消息)；失败时第一项为None
+    """
+    with status_lock:
+        targets = {}
+        for channel in channels:
+            image, chip_type, _ = _channel_target(channel_states.get(channel))
+            targets.setdefault((image, chip_type), []).append(channel)
+    
+    snapshots = {}
+    pinned = {}
+    for (image, chip_type), group in targets.items():
+        prefix = f"通道 {_format_channels(group)}: " if len(targets) > 1 else ""
+        if image not in pinned:
+            try:
+                pinned[image] = image_snapshot_store.pin(image)
+            except FileNotFoundError:
+                return None, f"{prefix}烧录文件不存在: {image}"
+            except OSError as e:
+                return None, f"{prefix}创建镜像快照失败: {str(e)}"
+        image_ok, image_message = check_image_for_chip(pinned[image].path, chip_type)
+        if not image_ok:
+            return None, prefix + image_message
+        for channel in group:
+            snapshots[channel] = pinned[image]
+    return snapshots, ""
+
+def _cleanup_snapshots():
+    """删除不再被排队或烧录中的通道使用的旧快照"""
+    with status_lock:
+        in_use = [channel_states.get(channel).snapshot.path for channel in channel_states.busy_channels()
+                  if channel_states.get(channel).snapshot is not None]
+    try:
+        image_snapshot_store.cleanup(in_use)
+    except OSError as e:
+        app.logger.warning(f"清理镜像快照失败: {str(e)}")
+
+def _format_channels(channels):
+    """通道号列表转为区间表示，如 [1, 2, 3, 5] -> 1-3,5"""
+    parts = []
+    for channel in sorted(channels):
+        if parts and parts[-1][1] == channel - 1:
+            parts[-1][1] = channel
+        else:
+            parts.append([channel, channel])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in parts)
+
+def _parse_channels(spec):
+    """
+    解析通道列表：整数列表，或 "1-4,7" 形式的字符串
+    :raises ValueError: 格式无效或通道号超出范围
+    """
+    if isinstance(spec, int):
+        spec = [spec]
+    if isinstance(spec, str):
+        channels = []
+        for part in spec.replace(" ", "").split(","):
+            if not part:
+                continue
+            if "-" in part:
+                first, last = part.split("-", 1)
+                channels.extend(range(int(first), int(last) + 1))
+            else:
+                channels.append(int(part))
+    else:
+        channels = [int(channel) for channel in spec]
+    if not channels or any(not 1 <= channel <= MAX_CHANNELS for channel in channels):
+        raise ValueError(f"通道号必须在1-{MAX_CHANNELS}之间")
+    return sorted(set(channels))
 
 def start_single_channel(channel, encryption_enabled):
     """启动单个通道的烧录"""
-    global processes, MAX_FLASH_COUNT
+    global MAX_FLASH_COUNT
     
     # 检查是否超过最大烧录次数
-    total_success = sum(success_count.values())
+    with status_lock:
+        total_success = channel_states.total_success
     if total_success >= MAX_FLASH_COUNT:
         return False, f"已达到最大烧录次数({MAX_FLASH_COUNT}次)，无法继续烧录"
     
+    # 固定镜像快照并检查与芯片是否匹配
+    snapshots, message = _pin_snapshots([channel])
+    if snapshots is None:
+        return False, message
+    
     with status_lock:
-        if channel_status[channel] == "烧录中":
+        state = channel_states.get(channel)
+        if state.status in BUSY_STATUSES:
             return False, "该通道正在烧录中"
+        if not state.serial or not state.ccxml_file:
+            return False, f"通道 {channel} 未连接烧录器"
+        queued = _enqueue_channel(channel, encryption_enabled, snapshots[channel])
     
-    # 创建并启动线程
-    thread = threading.Thread(target=_run_dslite, args=(channel, encryption_enabled), daemon=True)
-    thread.start()
-    processes[channel] = thread
+    if not queued:
+        return False, "该通道正在烧录中"
+    _notify_channel(channel)
+    _cleanup_snapshots()
     return True, f"通道 {channel} 烧录已启动"
 
 def start_all_channels(num_channels, encryption_enabled):
-    """启动所有通道的烧录"""
+    """启动所有通道的烧录（由调度器按并发上限依次执行）"""
     global is_running, MAX_FLASH_COUNT
     
     # 检查是否超过最大烧录次数
-    total_success = sum(success_count.values())
+    with status_lock:
+        total_success = channel_states.total_success
     if total_success >= MAX_FLASH_COUNT:
         return False, f"已达到最大烧录次数({MAX_FLASH_COUNT}次)，无法继续烧录"
     
+    # 固定各通道的镜像快照，并检查与芯片是否匹配，不匹配时整批拒绝
+    snapshots, message = _pin_snapshots(range(1, num_channels + 1))
+    if snapshots is None:
+        return False, message
+    
     with status_lock:
         if is_running:
             return False, "已有烧录任务在进行中"
+        
+        # 所有通道加入队列（烧录器已拔出或未生成ccxml的通道跳过，不计入失败）
+        rejected = []
+        skipped = []
+        for channel in range(1, num_channels + 1):
+            state = channel_states.get(channel)
+            if state.status in BUSY_STATUSES:
+                continue
+            if not state.serial or not state.ccxml_file:
+                skipped.append(channel)
+                continue
+            if not _enqueue_channel(channel, encryption_enabled, snapshots[channel]):
+                rejected.append(channel)
+    _notify_status()
+    _cleanup_snapshots()
     
-    # 启动每个通道
-    for channel in range(1, num_channels + 1):
-        with status_lock:
-            if channel_status[channel] != "烧录中":
-                thread = threading.Thread(target=_run_dslite, args=(channel, encryption_enabled), daemon=True)
-                thread.start()
-                processes[channel] = thread
-                time.sleep(0.2)  # 稍微延迟，避免同时启动冲突
-    
+    started = num_channels - len(rejected) - len(skipped)
+    if rejected:
+        app.logger.error(f"通道 {rejected} 加入烧录队列失败")
+        return False, f"{started} 个通道烧录已启动，通道 {', '.join(map(str, rejected))} 加入队列失败"
+    if skipped:
+        if not started:
+            return False, "没有已连接烧录器的通道"
+        return True, f"{started} 个通道烧录已启动（跳过未连接烧录器的通道 {', '.join(map(str, skipped))}）"
     return True, f"所有 {num_channels} 个通道烧录已启动"
 
 def stop_all_channels():
     """停止所有通道的烧录"""
-    global is_running, channel_status
+    # 先取消排队中的任务，避免终止过程中又有新任务开始
+    flash_scheduler_pool.cancel_pending()
     
-    # 标记状态为终止
     with status_lock:
-        for channel in processes:
-            if channel_status[channel] == "烧录中":
-                channel_status[channel] = "烧录终止"
-                fail_count[channel] += 1
-        
-        is_running = False
+        channels = channel_states.busy_channels()
+    
+    for channel in channels:
+        stop_channel(channel)
+    _notify_status()
     
     return True, "所有烧录任务已终止"
 
 def reset_counters():
     """重置所有烧录计数"""
-    global success_count, fail_count
     with status_lock:
-        success_count = {i: 0 for i in range(1, 9)}
-        fail_count = {i: 0 for i in range(1, 9)}
+        channel_states.reset_counters()
+    _notify_status()
     return True, "烧录计数已重置"
 
+# 常驻调试会话管理
+probe_sessions = probe_session.SessionManager(_build_debug_server_argv)
+
+# 烧录调度器：任务队列 + 工作线程池
+flash_scheduler_pool = flash_scheduler.FlashScheduler(_run_dslite, max_workers=MAX_CONCURRENT_FLASHES)
+
+def _count_active_processes():
+    """正在运行的dslite（或调试会话）进程数"""
+    with status_lock:
+        return sum(1 for state in channel_states.states() if state.process is not None)
+
+def _count_busy_channels():
+    with status_lock:
+        return channel_states.busy_count
+
+metrics_registry.gauge("uniflash_queue_depth", "排队等待的烧录任务数", func=flash_scheduler_pool.pending_count)
+metrics_registry.gauge("uniflash_active_processes", "正在运行的dslite进程数", func=_count_active_processes)
+metrics_registry.gauge("uniflash_busy_channels", "排队或烧录中的通道数", func=_count_busy_channels)
+metrics_registry.gauge("uniflash_max_concurrent", "最大并发烧录数", func=lambda: MAX_CONCURRENT_FLASHES)
+metrics_registry.gauge("uniflash_online_probes", "在线烧录器数", func=lambda: len(channel_serials))
+
 # ======================
 # 设备扫描相关函数
 # ======================
 
-def scan_devices():
-    """扫描连接的烧录器设备并生成对应的ccxml文件"""
-    global device_serials, CCXML_FILES, NUM_CHANNELS
+def _enumerate_probes():
+    """
+    运行xdsdfu枚举已连接的烧录器
+    :return: 序列号列表
+    :raises FileNotFoundError: 未找到xdsdfu
+    """
+    if not os.path.exists(XDSDFU_PATH):
+        raise FileNotFoundError(f"未找到设备扫描工具: {XDSDFU_PATH}")
     
+    started = time.monotonic()
+    lines = []
     try:
-        # 检查xdsdfu是否存在
-        if not os.path.exists(XDSDFU_PATH):
-            return False, [], f"未找到设备扫描工具: {XDSDFU_PATH}"
-        
-        # 执行扫描命令
-        result = subprocess.run(
-            [XDSDFU_PATH, "-e"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        
-        output = result.stdout + result.stderr
-        
-        # 解析输出，提取序列号
-        serials = []
-        pattern = r"Serial Num:\s+([A-Za-z0-9]+)"  # 匹配序列号格式
-        matches = re.findall(pattern, output)
-        
-        if not matches:
-            device_serials = []
-            return True, [], "未找到任何烧录器设备"
-        
-        # 限制最大数量为8
-        max_devices = min(len(matches), 8)
-        serials = matches[:max_devices]
-        device_serials = serials
-        
-        # 为每个设备生成对应的ccxml文件
-        success_channels = 0
-        for i in range(max_devices):
-            channel = i + 1  # 通道号从1开始
-            serial = serials[i]
-            
-            # 生成带有序列号的ccxml文件
-            success, msg = create_ccxml_with_serial(channel, serial)
-            if success:
-                CCXML_FILES[i] = msg  # 更新通道对应的ccxml文件路径
-                success_channels += 1
-                app.logger.info(f"通道 {channel} 已关联序列号: {serial}")
-            else:
-                app.logger.error(f"通道 {channel} 关联序列号失败: {msg}")
+        flash_process_engine.run([XDSDFU_PATH, "-e"], timeout=10, on_line=lines.append)
+    finally:
+        scan_duration_metric.observe(time.monotonic() - started)
+    output = "".join(lines)
+    
+    # 解析输出，提取序列号
+    pattern = r"Serial Num:\s+([A-Za-z0-9]+)"  # 匹配序列号格式
+    return re.findall(pattern, output)
+
+def apply_probe_serials(serials):
+    """
+    按扫描结果增量更新通道：已关联的烧录器保持原通道，只处理新插入和拔出的通道，
+    不影响其他通道（包括正在烧录的通道）
+    :param serials: 在线烧录器序列号列表
+    :return: 已配置ccxml文件的在线通道数
+    """
+    with probe_apply_lock:
+        return _apply_probe_serials(serials)
+
+def _apply_probe_serials(serials):
+    """apply_probe_serials的实现（需在持有probe_apply_lock时调用）"""
+    global device_serials, NUM_CHANNELS, serial_channel_map, channel_serials, is_running
+    
+    with status_lock:
+        old_online = dict(channel_serials)
+        new_map = probe_watcher.assign_channels(serial_channel_map, serials, MAX_CHANNELS)
+    new_online = probe_watcher.online_channels(new_map, serials)
+    changed = {ch for ch in set(old_online) | set(new_online) if old_online.get(ch) != new_online.get(ch)}
+    with status_lock:
+        masters = {ch: _channel_target(channel_states.get(ch))[2] for ch in changed if ch in new_online}
+    
+    # 只为变化的通道生成ccxml文件（按通道分配的母版）
+    generated = {}
+    for channel in sorted(changed):
+        serial = new_online.get(channel)
+        if not serial:
+            app.logger.warning(f"通道 {channel} 烧录器已断开: {old_online.get(channel)}")
+            continue
+        success, msg = create_ccxml_with_serial(channel, serial, masters[channel])
+        if success:
+            generated[channel] = msg
+            app.logger.info(f"通道 {channel} 已关联序列号: {serial}")
+        else:
+            app.logger.error(f"通道 {channel} 关联序列号失败: {msg}")
+    
+    with status_lock:
+        for channel in changed:
+            if channel in generated:
+                channel_states.set_probe(channel, new_online[channel], generated[channel])
+                if channel_states.get(channel).status == "烧录器已断开":
+                    channel_states.set_status(channel, "未开始")
+            elif channel not in new_online:
+                channel_states.set_probe(channel, "", "")
+                # 正在烧录的通道由烧录线程记录结果
+                if channel_states.get(channel).status not in BUSY_STATUSES:
+                    channel_states.set_status(channel, "烧录器已断开")
         
-        # 更新通道数量为成功关联的设备数
-        if success_channels > 0:
-            NUM_CHANNELS = success_channels
+        serial_channel_map = new_map
+        channel_serials = new_online
+        device_serials = [new_online[ch] for ch in sorted(new_online)]
         
-        return True, serials, f"成功找到 {len(serials)} 个设备，其中 {success_channels} 个已配置ccxml文件"
+        # 通道数覆盖所有已分配过的通道，拔出的烧录器保留其通道位置
+        if new_map:
+            NUM_CHANNELS = max(new_map.values())
         
+        configured = sum(1 for ch in new_online if channel_states.get(ch).ccxml_file)
+        busy = _is_any_busy()
+        is_running = busy
+        ccxml_in_use = [state.ccxml_file for state in channel_states.states()]
+    
+    # 无烧录任务时清理不再使用的ccxml文件（烧录中的通道可能仍在读取旧文件）
+    if not busy:
+        cleanup_generated_ccxml(ccxml_in_use)
+    
+    if changed:
+        _notify_status()
+    return configured
+
+def scan_devices():
+    """扫描连接的烧录器设备并增量更新通道"""
+    try:
+        serials = _enumerate_probes()
+    except FileNotFoundError as e:
+        return False, [], str(e)
     except Exception as e:
         app.logger.error(f"设备扫描错误: {str(e)}")
         return False, [], f"扫描设备时发生错误: {str(e)}"
+    
+    configured = apply_probe_serials(serials)
+    probe_watch.notify_scanned(serials)
+    
+    if not serials:
+        return True, [], "未找到任何烧录器设备"
+    return True, serials, f"成功找到 {len(serials)} 个设备，其中 {configured} 个已配置ccxml文件"
+
+def _watch_scan():
+    """热插拔监视使用的扫描函数，失败时返回None"""
+    try:
+        return _enumerate_probes()
+    except Exception as e:
+        app.logger.warning(f"自动扫描烧录器失败: {str(e)}")
+        return None
+
+def _on_probes_changed(serials):
+    """热插拔监视发现烧录器变化"""
+    app.logger.info(f"检测到烧录器变化，当前在线: {serials}")
+    apply_probe_serials(serials)
+
+def _allow_periodic_scan():
+    """烧录进行中时不做兜底扫描（插拔事件仍会触发扫描）"""
+    with status_lock:
+        return not is_running
+
+# 烧录器热插拔监视（程序入口中启动）
+probe_watch = probe_watcher.ProbeWatcher(
+    _watch_scan,
+    _on_probes_changed,
+    interval=PROBE_WATCH_INTERVAL or 5,
+    should_scan=_allow_periodic_scan
+)
 
 # ======================
 # Flask路由
@@ -561,32 +1437,173 @@ def set_chip_type():
     TARGET_DEVICE_TYPE = chip_type
     return jsonify({"status": "success"})
 
+@app.route('/api/channel_targets', methods=['GET'])
+def get_channel_targets():
+    """获取整站设置与各通道单独分配的烧录目标"""
+    with status_lock:
+        targets = {state.number: _build_target_summary(state) for state in channel_states.states(NUM_CHANNELS)}
+    return jsonify({
+        "status": "success",
+        "default": {
+            "image": os.path.basename(OUT_FILE),
+            "chip_type": TARGET_DEVICE_TYPE,
+            "master_ccxml": MASTER_CCXML_PATH
+        },
+        "channels": {channel: target for channel, target in targets.items() if target}
+    })
+
+@app.route('/api/channel_targets', methods=['POST'])
+def set_channel_targets():
+    """
+    为一组通道分配镜像、芯片型号和母版ccxml
+    请求: {"channels": [1, 2] 或 "1-4,7", "image": 文件名, "chip_type": 型号, "master_ccxml": 路径}
+    未提供的项保持不变，值为空时该项恢复使用整站设置；"clear": true 时全部恢复整站设置
+    """
+    data = request.json or {}
+    try:
+        channels = _parse_channels(data.get("channels"))
+    except (ValueError, TypeError) as e:
+        return jsonify({"status": "error", "message": f"通道列表无效: {str(e)}"})
+    
+    updates = {}
+    if data.get("clear"):
+        updates = {"image": None, "chip_type": None, "master_ccxml": None}
+    
+    if data.get("image"):
+        filename = os.path.basename(data["image"])
+        path = os.path.join(IMAGE_DIR, filename)
+        if not os.path.isfile(path):
+            return jsonify({"status": "error", "message": f"文件不存在: {filename}"})
+        if not filename.lower().endswith(UPLOAD_EXTENSIONS):
+            return jsonify({"status": "error", "message": f"请选择{UPLOAD_EXTENSIONS}格式的文件"})
+        updates["image"] = path
+    elif "image" in data:
+        updates["image"] = None
+    
+    if data.get("chip_type"):
+        if data["chip_type"] not in CHIP_CCXML_MAP:
+            return jsonify({"status": "error", "message": f"未配置的芯片型号: {data['chip_type']}"})
+        updates["chip_type"] = data["chip_type"]
+    elif "chip_type" in data:
+        updates["chip_type"] = None
+    
+    if data.get("master_ccxml"):
+        master = data["master_ccxml"]
+        if master not in CHIP_CCXML_MAP.values():
+            return jsonify({"status": "error", "message": f"未配置的母版ccxml: {master}（可选: {list(CHIP_CCXML_MAP.values())}）"})
+        # 先解析母版，确认可以生成ccxml后再修改通道设置
+        try:
+            ccxml_generator.get_template(master)
+        except FileNotFoundError:
+            return jsonify({"status": "error", "message": f"母版ccxml文件不存在: {master}"})
+        except (OSError, ccxml_template.CcxmlTemplateError) as e:
+            return jsonify({"status": "error", "message": f"母版ccxml无效: {str(e)}"})
+        updates["master_ccxml"] = master
+    elif "master_ccxml" in data:
+        updates["master_ccxml"] = None
+    
+    if not updates:
+        return jsonify({"status": "error", "message": "请提供要分配的镜像、芯片型号或母版ccxml"})
+    
+    # 重新生成ccxml期间不允许烧录器分配变化
+    with probe_apply_lock:
+        regenerate = []
+        previous = {}
+        targets = {}
+        with status_lock:
+            busy = [channel for channel in channels if channel_states.get(channel).status in BUSY_STATUSES]
+            if busy:
+                return jsonify({"status": "error", "message": f"通道 {_format_channels(busy)} 正在烧录，无法修改烧录目标"})
+            
+            for channel in channels:
+                state = channel_states.get(channel)
+                previous[channel] = (state.image, state.chip_type, state.master_ccxml)
+                old_master = _channel_target(state)[2]
+                channel_states.set_target(
+                    channel,
+                    updates.get("image", state.image),
+                    updates.get("chip_type", state.chip_type),
+                    updates.get("master_ccxml", state.master_ccxml)
+                )
+                image, chip_type, master = _channel_target(state)
+                targets.setdefault((image, chip_type), []).append(channel)
+                # 母版变化的在线通道需要重新生成ccxml
+                if state.serial and master != old_master:
+                    regenerate.append((channel, state.serial, master, old_master))
+        
+        errors = []
+        generated = []
+        for channel, serial, master, old_master in regenerate:
+            success, msg = create_ccxml_with_serial(channel, serial, master)
+            if not success:
+                errors.append(f"通道 {channel}: {msg}")
+                break
+            generated.append((channel, serial, old_master, msg))
+        
+        if errors:
+            # 生成失败时恢复所有通道原来的烧录目标和ccxml文件
+            for channel, serial, old_master, _ in generated:
+                create_ccxml_with_serial(channel, serial, old_master)
+            with status_lock:
+                for channel, (image, chip_type, master) in previous.items():
+                    channel_states.set_target(channel, image, chip_type, master)
+            _notify_status()
+            return jsonify({"status": "error", "message": f"{'；'.join(errors)}，烧录目标未修改"})
+        
+        with status_lock:
+            for channel, serial, _, ccxml_file in generated:
+                if channel_states.get(channel).serial == serial:
+                    channel_states.set_probe(channel, serial, ccxml_file)
+    _notify_status()
+    
+    # 提示镜像与芯片型号不匹配的通道
+    message = f"通道 {_format_channels(channels)} 的烧录目标已更新"
+    for (image, chip_type), group in targets.items():
+        image_ok, image_message = check_image_for_chip(image, chip_type)
+        if not image_ok:
+            message += f"（警告: 通道 {_format_channels(group)} {image_message}）"
+    return jsonify({"status": "success", "message": message})
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """获取配置信息"""
-    # 计算OUT文件的CRC32
-    crc32 = calculate_file_crc32(OUT_FILE)
+    # 获取OUT文件的CRC32等元数据（命中缓存时不读取文件）
+    metadata = get_image_metadata(OUT_FILE) or {}
     
     return jsonify({
         "num_channels": NUM_CHANNELS,
         "dslite_path": DSLITE_PATH,
         "out_file": OUT_FILE,
-        "out_file_crc32": crc32,
+        "out_file_crc32": metadata.get("crc32"),
+        "out_file_sha256": metadata.get("sha256"),
+        "out_file_size": metadata.get("size"),
+        "out_file_info": get_image_summary(metadata),
         "max_flash_count": MAX_FLASH_COUNT,
-        "ccxml_files": [CCXML_FILES[i] for i in range(NUM_CHANNELS)],
+        "max_concurrent": MAX_CONCURRENT_FLASHES,
+        "skip_if_identical": SKIP_IF_IDENTICAL,
+        "upload_extensions": list(UPLOAD_EXTENSIONS),
+        "persistent_session": PERSISTENT_SESSION_ENABLED,
+        "persistent_session_available": bool(DEBUG_SERVER_COMMAND),
+        "factory_reset_mode": FACTORY_RESET_MODE,
+        "combined_factory_reset": COMBINED_FACTORY_RESET,
+        "auto_retry": flash_retry_policy.enabled,
+        "retry_policy": flash_retry_policy.to_dict()["rules"],
+        "ccxml_files": [channel_states.get(ch).ccxml_file for ch in range(1, NUM_CHANNELS + 1)],
         "master_ccxml": MASTER_CCXML_PATH
     })
 
 @app.route('/api/config', methods=['POST'])
 def update_config():
     """更新配置信息"""
-    global NUM_CHANNELS, MAX_FLASH_COUNT
+    global NUM_CHANNELS, MAX_FLASH_COUNT, MAX_CONCURRENT_FLASHES, SKIP_IF_IDENTICAL, PERSISTENT_SESSION_ENABLED
+    global AUTO_RETRY_ENABLED, FACTORY_RESET_MODE, COMBINED_FACTORY_RESET
     data = request.json
     
     if "num_channels" in data:
         new_num = int(data["num_channels"])
-        if 1 <= new_num <= 8:
+        if 1 <= new_num <= MAX_CHANNELS:
             NUM_CHANNELS = new_num
+            _notify_status()
             return jsonify({
                 "status": "success",
                 "message": f"通道数已更新为 {NUM_CHANNELS}"
@@ -594,7 +1611,7 @@ def update_config():
         else:
             return jsonify({
                 "status": "error",
-                "message": "通道数必须在1-8之间"
+                "message": f"通道数必须在1-{MAX_CHANNELS}之间"
             })
     
     if "max_flash_count" in data:
@@ -611,32 +1628,247 @@ def update_config():
                 "message": "最大烧录次数必须在1-100之间"
             })
     
+    if "skip_if_identical" in data:
+        SKIP_IF_IDENTICAL = bool(data["skip_if_identical"])
+        return jsonify({
+            "status": "success",
+            "message": f"内容一致跳过烧录已{'开启' if SKIP_IF_IDENTICAL else '关闭'}"
+        })
+    
+    if "factory_reset_mode" in data:
+        if data["factory_reset_mode"] not in FACTORY_RESET_MODES:
+            return jsonify({
+                "status": "error",
+                "message": f"工厂复位时机必须是 {' / '.join(FACTORY_RESET_MODES)} 之一"
+            })
+        FACTORY_RESET_MODE = data["factory_reset_mode"]
+        return jsonify({
+            "status": "success",
+            "message": f"加密烧录{'仅在芯片锁定时' if FACTORY_RESET_MODE == 'on_locked' else '每次'}执行工厂复位"
+        })
+    
+    if "combined_factory_reset" in data:
+        COMBINED_FACTORY_RESET = bool(data["combined_factory_reset"])
+        return jsonify({
+            "status": "success",
+            "message": f"工厂复位与烧录{'合并为一次dslite调用' if COMBINED_FACTORY_RESET else '分两次dslite调用'}"
+        })
+    
+    if "auto_retry" in data:
+        AUTO_RETRY_ENABLED = bool(data["auto_retry"])
+        flash_retry_policy.enabled = AUTO_RETRY_ENABLED
+        return jsonify({
+            "status": "success",
+            "message": f"失败自动重试已{'开启' if AUTO_RETRY_ENABLED else '关闭'}"
+        })
+    
+    if "retry_policy" in data:
+        # {失败类别: {max_retries, backoff, factor, max_backoff, factory_reset}}
+        try:
+            for failure_class, fields in data["retry_policy"].items():
+                if failure_class not in flash_failures.FAILURE_LABELS:
+                    raise ValueError(f"未知的失败类别: {failure_class}")
+                flash_retry_policy.update_rule(failure_class, **fields)
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({
+                "status": "error",
+                "message": f"重试规则无效: {str(e)}"
+            })
+        return jsonify({
+            "status": "success",
+            "message": "重试规则已更新"
+        })
+    
+    if "persistent_session" in data:
+        if data["persistent_session"] and not DEBUG_SERVER_COMMAND:
+            return jsonify({
+                "status": "error",
+                "message": "未配置常驻调试服务启动命令(DEBUG_SERVER_COMMAND)"
+            })
+        PERSISTENT_SESSION_ENABLED = bool(data["persistent_session"])
+        if not PERSISTENT_SESSION_ENABLED:
+            probe_sessions.close_all()
+        return jsonify({
+            "status": "success",
+            "message": f"常驻调试会话已{'开启' if PERSISTENT_SESSION_ENABLED else '关闭'}"
+        })
+    
+    if "max_concurrent" in data:
+        try:
+            new_concurrent = int(data["max_concurrent"])
+        except (ValueError, TypeError):
+            return jsonify({
+                "status": "error",
+                "message": f"最大并发烧录数无效: {data['max_concurrent']!r}"
+            })
+        if 1 <= new_concurrent <= MAX_CHANNELS:
+            MAX_CONCURRENT_FLASHES = new_concurrent
+            flash_scheduler_pool.set_max_workers(new_concurrent)
+            return jsonify({
+                "status": "success",
+                "message": f"最大并发烧录数已更新为 {MAX_CONCURRENT_FLASHES}"
+            })
+        else:
+            return jsonify({
+                "status": "error",
+                "message": f"最大并发烧录数必须在1-{MAX_CHANNELS}之间"
+            })
+    
     return jsonify({
         "status": "error",
         "message": "无效的配置参数"
     })
 
+def _build_status(since=None):
+    """
+    构建状态数据（需在持有status_lock时调用）
+    :param since: 客户端上次获取的版本号，指定时只包含之后变化的通道；为None时返回全量状态
+    """
+    if since is not None and since <= channel_states.version:
+        states = channel_states.changed_since(since, NUM_CHANNELS)
+    else:
+        states = [channel_states.get(ch) for ch in range(1, NUM_CHANNELS + 1)]
+    
+    return {
+        "is_running": is_running,
+        "num_channels": NUM_CHANNELS,
+        "max_flash_count": MAX_FLASH_COUNT,
+        "max_concurrent": MAX_CONCURRENT_FLASHES,
+        "queue_depth": flash_scheduler_pool.pending_count(),
+        "total_success": channel_states.total_success,
+        "total_fail": channel_states.total_fail,
+        "version": channel_states.version,
+        "partial": since is not None and since <= channel_states.version,
+        "channels": {state.number: state.status for state in states},
+        "counters": {
+            "success": {state.number: state.success for state in states},
+            "fail": {state.number: state.fail for state in states}
+        },
+        "progress": {state.number: state.progress for state in states},
+        "targets": {state.number: _build_target_summary(state) for state in states},
+        "serials": device_serials,
+        "channel_serials": {state.number: state.serial for state in states if state.serial},
+        "ccxml_files": {state.number: state.ccxml_file for state in states}  # 通道号对应ccxml文件
+    }
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    """获取当前状态"""
+    """获取当前状态（?since=<版本号> 时只返回之后变化的通道）"""
+    since = request.args.get("since", type=int)
     with status_lock:
-        total_success = sum(success_count.values())
-        total_fail = sum(fail_count.values())
-        
-        return jsonify({
-            "is_running": is_running,
-            "num_channels": NUM_CHANNELS,
-            "max_flash_count": MAX_FLASH_COUNT,
-            "total_success": total_success,
-            "total_fail": total_fail,
-            "channels": {k: v for k, v in channel_status.items() if k <= NUM_CHANNELS},
-            "counters": {
-                "success": {k: v for k, v in success_count.items() if k <= NUM_CHANNELS},
-                "fail": {k: v for k, v in fail_count.items() if k <= NUM_CHANNELS}
-            },
-            "serials": device_serials,
-            "ccxml_files": {i+1: CCXML_FILES[i] for i in range(NUM_CHANNELS)}  # 通道号对应ccxml文件
+        return jsonify(_build_status(since))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """性能指标（Prometheus文本格式）"""
+    return Response(metrics_registry.render(), content_type=metrics.MetricsRegistry.CONTENT_TYPE)
+
+@app.route('/api/lots', methods=['GET'])
+def get_lots():
+    """最近烧录批次列表"""
+    return jsonify({"status": "success", "lots": timeline_store.list_lots()})
+
+@app.route('/api/lots/<lot_id>/trace', methods=['GET'])
+def export_lot_trace(lot_id):
+    """导出批次时间线（Chrome Trace / Perfetto JSON），lot_id为latest时导出最近批次"""
+    if lot_id == "latest":
+        lot_id = timeline_store.latest_lot_id()
+    lot = timeline_store.get_lot(lot_id) if lot_id else None
+    if lot is None:
+        return jsonify({"status": "error", "message": "批次不存在"}), 404
+    
+    return Response(
+        json.dumps(flash_timeline.to_chrome_trace(lot), ensure_ascii=False),
+        mimetype='application/json',
+        headers={"Content-Disposition": f"attachment; filename=trace-{lot_id}.json"}
+    )
+
+def _record_filters():
+    """从请求参数读取生产记录查询条件"""
+    return {
+        "lot_id": request.args.get("lot_id"),
+        "serial": request.args.get("serial"),
+        "channel": request.args.get("channel", type=int),
+        "result": request.args.get("result"),
+        "failure_class": request.args.get("failure_class"),
+        "since": request.args.get("since", type=float),
+        "until": request.args.get("until", type=float),
+    }
+
+@app.route('/api/records', methods=['GET'])
+def get_records():
+    """分页查询生产记录（?after_id=上一页最后一条的id&limit=每页条数，及筛选条件）"""
+    after_id = request.args.get("after_id", 0, type=int)
+    limit = min(max(request.args.get("limit", 100, type=int), 1), 1000)
+    records = record_store.query(after_id, limit, _record_filters())
+    return jsonify({
+        "status": "success",
+        "records": records,
+        "next_after_id": records[-1]["id"] if len(records) == limit else None
+    })
+
+@app.route('/api/records/export', methods=['GET'])
+def export_records():
+    """流式导出生产记录（?format=csv|json，及筛选条件）"""
+    export_format = request.args.get("format", "csv")
+    filters = _record_filters()
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    
+    if export_format == "json":
+        def generate_json():
+            # 逐条输出JSON数组，不在内存中拼接全部记录
+            yield "["
+            for index, record in enumerate(record_store.iter_records(filters)):
+                yield ("," if index else "") + "\n" + json.dumps(record, ensure_ascii=False)
+            yield "\n]\n"
+        return Response(generate_json(), mimetype='application/json', headers={
+            "Content-Disposition": f"attachment; filename=records-{timestamp}.json"
         })
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write("\ufeff")  # Excel按UTF-8打开
+        writer.writerow(production_records.EXPORT_COLUMNS)
+        for index, record in enumerate(record_store.iter_records(filters), 1):
+            writer.writerow([record[column] for column in production_records.EXPORT_COLUMNS])
+            if index % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    return Response(generate_csv(), mimetype='text/csv', headers={
+        "Content-Disposition": f"attachment; filename=records-{timestamp}.csv"
+    })
+
+@app.route('/api/events', methods=['GET'])
+def status_event_stream():
+    """状态推送（Server-Sent Events）：连接时发送全量快照，之后仅推送变化的通道"""
+    q = status_broadcaster.subscribe()
+    with status_lock:
+        snapshot = _build_status()
+    
+    def generate():
+        try:
+            yield status_events.format_sse("snapshot", snapshot)
+            while True:
+                try:
+                    message = q.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                # 消费过慢被移除：结束响应，客户端1秒后重连并重新获取全量快照
+                if message is status_events.CLOSED:
+                    yield "retry: 1000\n\n"
+                    return
+                yield message
+        finally:
+            status_broadcaster.unsubscribe(q)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
 @app.route('/api/start', methods=['POST'])
 def start_flash():
@@ -675,6 +1907,21 @@ def stop_flash():
         "message": message
     })
 
+@app.route('/api/stop/<int:channel>', methods=['POST'])
+def stop_single_flash(channel):
+    """停止单个通道烧录"""
+    if 1 <= channel <= NUM_CHANNELS:
+        success, message = stop_channel(channel)
+        return jsonify({
+            "status": "success" if success else "error",
+            "message": message
+        })
+    else:
+        return jsonify({
+            "status": "error",
+            "message": f"无效的通道号: {channel}"
+        })
+
 @app.route('/api/reset', methods=['POST'])
 def reset_counts():
     """重置烧录计数"""
@@ -688,18 +1935,38 @@ def reset_counts():
 def scan():
     """扫描设备并生成ccxml文件"""
     success, serials, message = scan_devices()
-    return jsonify({
-        "status": "success" if success else "error",
-        "message": message,
-        "serials": serials,
-        "count": len(serials),
-        "configured_count": sum(1 for i in range(len(serials)) if CCXML_FILES[i] and os.path.exists(CCXML_FILES[i]))
-    })
+    with status_lock:
+        configured = sum(
+            1 for ch in channel_serials
+            if channel_states.get(ch).ccxml_file and os.path.exists(channel_states.get(ch).ccxml_file)
+        )
+        return jsonify({
+            "status": "success" if success else "error",
+            "message": message,
+            "serials": serials,
+            "count": len(serials),
+            "configured_count": configured,
+            "num_channels": NUM_CHANNELS,
+            "channel_serials": channel_serials
+        })
+
+def _image_flash_stats():
+    """各镜像（按SHA-256）的烧录统计，缓存IMAGE_STATS_TTL秒"""
+    with _image_stats_lock:
+        now = time.monotonic()
+        if now - _image_stats_cache["time"] >= IMAGE_STATS_TTL:
+            _image_stats_cache["stats"] = record_store.image_stats()
+            _image_stats_cache["time"] = now
+        return _image_stats_cache["stats"]
 
 # 新增：获取image文件夹内的文件列表
 @app.route('/api/image_files', methods=['GET'])
 def get_image_files():
-    """获取image目录下的所有.out文件列表"""
+    """
+    获取image目录下的镜像列表（.out和.hex），数据来自镜像库索引
+    查询参数: q=文件名包含的文字, ext=扩展名, arch=目标架构,
+              sort=name|mtime|size|last_flashed, order=asc|desc, offset, limit
+    """
     try:
         if not os.path.exists(IMAGE_DIR):
             return jsonify({
@@ -707,15 +1974,27 @@ def get_image_files():
                 "message": f"image目录不存在: {IMAGE_DIR}"
             })
         
-        # 获取目录下所有.out文件
-        out_files = []
-        for file in os.listdir(IMAGE_DIR):
-            if file.endswith(".out") and os.path.isfile(os.path.join(IMAGE_DIR, file)):
-                out_files.append(file)
+        offset = max(request.args.get("offset", 0, type=int), 0)
+        limit = request.args.get("limit", type=int)
+        if limit is not None:
+            limit = min(max(limit, 1), 1000)
+        total, items = image_index.query(
+            search=request.args.get("q", ""),
+            ext=request.args.get("ext"),
+            architecture=request.args.get("arch"),
+            sort=request.args.get("sort", "name"),
+            descending=request.args.get("order") == "desc",
+            offset=offset,
+            limit=limit,
+            stats=_image_flash_stats()
+        )
         
         return jsonify({
             "status": "success",
-            "files": out_files,
+            "files": [item["name"] for item in items],
+            "items": items,
+            "total": total,
+            "offset": offset,
             "current_file": os.path.basename(OUT_FILE)
         })
     except Exception as e:
@@ -747,30 +2026,125 @@ def set_image_file():
             "message": f"文件不存在: {filename}"
         })
     
-    if not filename.endswith(".out"):
+    if not filename.lower().endswith(UPLOAD_EXTENSIONS):
         return jsonify({
             "status": "error",
-            "message": "请选择.out格式的文件"
+            "message": f"请选择{UPLOAD_EXTENSIONS}格式的文件"
         })
     
     # 更新全局变量
     OUT_FILE = new_path
     app.logger.info(f"已更新烧录文件为: {OUT_FILE}")
     
-    # 计算新文件的CRC32
-    crc32 = calculate_file_crc32(OUT_FILE)
+    # 获取新文件的CRC32等元数据
+    metadata = get_image_metadata(OUT_FILE) or {}
+    
+    # 提示镜像与当前芯片型号不匹配
+    message = f"已选择烧录文件: {filename}"
+    image_ok, image_message = check_image_for_chip(OUT_FILE, TARGET_DEVICE_TYPE)
+    if not image_ok:
+        message += f"（警告: {image_message}）"
     
     return jsonify({
         "status": "success",
-        "message": f"已选择烧录文件: {filename}",
+        "message": message,
         "current_file": filename,
-        "out_file_crc32": crc32
+        "out_file_crc32": metadata.get("crc32"),
+        "out_file_sha256": metadata.get("sha256"),
+        "out_file_size": metadata.get("size"),
+        "out_file_info": get_image_summary(metadata)
+    })
+
+# 允许上传的镜像类型
+UPLOAD_EXTENSIONS = ('.out', '.hex')
+
+def _secure_filename(filename):
+    """过滤文件名中的危险字符，仅保留安全字符（替代werkzeug的secure_filename）"""
+    # 移除路径分隔符和特殊字符
+    filename = re.sub(r'[\\/:"*?<>|]+', '_', filename)
+    # 移除前导/尾随空格和点
+    filename = filename.strip().strip('.')
+    # 确保文件名不为空
+    return filename if filename else f"upload_{int(time.time())}"
+
+def _image_sha256(path):
+    """文件的SHA-256（使用元数据缓存），无法读取时返回None"""
+    metadata = image_metadata_cache.get(path)
+    return metadata["sha256"] if metadata else None
+
+def _store_uploaded_image(stream, filename):
+    """
+    流式保存上传的镜像：边写临时文件边计算CRC32/SHA-256，与已有文件内容相同时不重复保存，
+    否则原子重命名为目标文件（同名文件被替换）
+    :param stream: 上传内容的输入流
+    :param filename: 上传的文件名
+    :return: jsonify响应
+    """
+    filename = _secure_filename(filename)
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in UPLOAD_EXTENSIONS:
+        return jsonify({
+            "status": "error",
+            "message": f"请上传{UPLOAD_EXTENSIONS}格式的文件"
+        })
+    
+    filepath = os.path.join(IMAGE_DIR, filename)
+    try:
+        received = image_store.receive_stream(stream, IMAGE_DIR)
+    except Exception as e:
+        app.logger.error(f"文件上传失败: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"文件上传失败: {str(e)}"
+        })
+    
+    try:
+        if received.size == 0:
+            received.discard()
+            return jsonify({"status": "error", "message": "上传的文件为空"})
+        
+        # 按内容去重：已有相同内容的文件时直接使用该文件
+        duplicate = image_store.find_duplicate(IMAGE_DIR, received, ext, _image_sha256)
+        if duplicate is not None:
+            received.discard()
+            message = (f"文件内容未变化: {duplicate}" if duplicate == filename
+                       else f"文件内容与已有文件 {duplicate} 相同，未重复保存")
+            app.logger.info(f"上传的文件 {filename} 与 {duplicate} 内容相同 (SHA-256: {received.sha256})")
+            return jsonify({
+                "status": "success",
+                "message": message,
+                "filename": duplicate,
+                "deduplicated": True,
+                "crc32": received.crc32,
+                "sha256": received.sha256
+            })
+        
+        replaced = os.path.exists(filepath)
+        os.replace(received.tmp_path, filepath)
+    except Exception as e:
+        received.discard()
+        app.logger.error(f"文件上传失败: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"文件上传失败: {str(e)}"
+        })
+    
+    image_metadata_cache.invalidate(filepath)
+    app.logger.info(f"文件上传成功: {filepath} ({received.size} 字节, SHA-256: {received.sha256}"
+                    f"{', 替换了同名文件' if replaced else ''})")
+    return jsonify({
+        "status": "success",
+        "message": f"文件上传成功: {filename}{'（已替换同名文件）' if replaced else ''}",
+        "filename": filename,
+        "deduplicated": False,
+        "crc32": received.crc32,
+        "sha256": received.sha256
     })
 
-# 新增：处理文件上传（不依赖werkzeug）
+# 处理表单文件上传（multipart，由Flask解析表单后分块读取）
 @app.route('/api/upload_image', methods=['POST'])
 def upload_image():
-    """处理上传的烧录文件并保存到image目录（仅使用标准库）"""
+    """处理上传的烧录文件并保存到image目录"""
     # 检查是否有文件上传
     if 'file' not in request.files:
         return jsonify({
@@ -787,62 +2161,225 @@ def upload_image():
             "message": "未选择文件"
         })
     
-    # 验证文件类型（.out或.hex）
-    allowed_extensions = ('.out', '.hex')
-    if not file.filename.lower().endswith(allowed_extensions):
-        return jsonify({
-            "status": "error",
-            "message": f"请上传{allowed_extensions}格式的文件"
-        })
+    return _store_uploaded_image(file.stream, file.filename)
+
+# 流式上传：请求体即文件内容，不经过表单解析和整体缓存
+@app.route('/api/images/<path:filename>', methods=['PUT'])
+def put_image(filename):
+    """流式上传烧录文件（前端和CI使用）"""
+    return _store_uploaded_image(request.stream, os.path.basename(filename))
+
+@app.route('/api/images/gc', methods=['POST'])
+def collect_image_garbage():
+    """
+    清理image目录：删除中断上传留下的临时文件，并列出内容重复的副本
+    请求: {"remove": [文件名, ...]} 删除已确认的重复副本（只删除仍在候选列表中的文件）；
+          不提供remove时只返回候选列表（不同文件名的镜像可能是有意保留的，不自动删除）；
+          {"dry_run": true} 时不删除任何文件
+    保留顺序: 正在使用的文件（整站烧录文件、通道分配的文件） > 文件名最短 > 修改时间最早
+    """
+    data = (request.json or {}) if request.is_json else {}
+    dry_run = bool(data.get("dry_run"))
+    confirmed = data.get("remove") or []
+    if not isinstance(confirmed, list):
+        return jsonify({"status": "error", "message": "remove应为文件名列表"})
+    confirmed = {os.path.basename(str(name)) for name in confirmed}
+    
+    with status_lock:
+        in_use = {os.path.abspath(OUT_FILE)}
+        in_use |= {os.path.abspath(state.image) for state in channel_states.states() if state.image}
+    
+    candidates, removed, kept = [], [], []
+    for group in image_store.find_duplicate_groups(IMAGE_DIR, _image_sha256):
+        paths = [os.path.join(IMAGE_DIR, name) for name in group]
+        paths.sort(key=lambda path: (os.path.abspath(path) not in in_use, len(os.path.basename(path)),
+                                     os.path.getmtime(path)))
+        keep = paths[0]
+        kept.append(os.path.basename(keep))
+        for path in paths[1:]:
+            name = os.path.basename(path)
+            if os.path.abspath(path) in in_use:
+                continue
+            candidates.append({"name": name, "duplicate_of": os.path.basename(keep)})
+            if dry_run or name not in confirmed:
+                continue
+            try:
+                os.remove(path)
+                image_metadata_cache.invalidate(path)
+            except OSError as e:
+                app.logger.warning(f"删除重复镜像失败: {path}: {str(e)}")
+                continue
+            removed.append(name)
+    
+    stale = [] if dry_run else image_store.remove_stale_uploads(IMAGE_DIR)
+    if removed:
+        app.logger.info(f"已删除重复镜像: {removed}（保留: {kept}）")
+    pending = [item for item in candidates if item["name"] not in removed]
+    message = f"已删除 {len(removed)} 个重复镜像" + (f"、{len(stale)} 个上传临时文件" if stale else "")
+    if pending:
+        message += f"，{len(pending)} 个重复镜像待确认删除"
+    return jsonify({
+        "status": "success",
+        "message": message,
+        "candidates": pending,
+        "removed": removed,
+        "kept": kept,
+        "stale_uploads": stale,
+        "dry_run": dry_run
+    })
+
+# ======================
+# 代理模式：接收协调节点分发的镜像
+# ======================
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def _find_agent_image(sha256):
+    """按SHA-256查找已接收的镜像，不存在时返回None"""
+    for ext in (".out", ".hex"):
+        path = os.path.join(AGENT_IMAGE_DIR, sha256 + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+@app.route('/api/agent/images/<sha256>', methods=['GET'])
+def agent_has_image(sha256):
+    """查询代理是否已有该镜像"""
+    path = _find_agent_image(sha256) if SHA256_PATTERN.match(sha256) else None
+    if path is None:
+        return jsonify({"status": "error", "message": "镜像不存在"}), 404
+    return jsonify({"status": "success", "path": path})
+
+@app.route('/api/agent/images/<sha256>', methods=['PUT'])
+def agent_put_image(sha256):
+    """接收镜像（请求体为文件内容，边接收边计算哈希，校验通过后原子重命名）"""
+    if not SHA256_PATTERN.match(sha256):
+        return jsonify({"status": "error", "message": "无效的SHA-256"})
+    
+    ext = os.path.splitext(request.args.get("filename", ""))[1].lower()
+    if ext not in (".out", ".hex"):
+        ext = ".out"
     
-    # 确保image目录存在
-    if not os.path.exists(IMAGE_DIR):
-        os.makedirs(IMAGE_DIR)
+    if _find_agent_image(sha256):
+        return jsonify({"status": "success", "message": "镜像已存在"})
     
+    os.makedirs(AGENT_IMAGE_DIR, exist_ok=True)
+    tmp_path = os.path.join(AGENT_IMAGE_DIR, f"{sha256}.{threading.get_ident()}.tmp")
+    digest = hashlib.sha256()
     try:
-        # 自定义安全文件名处理（替代werkzeug的secure_filename）
-        def secure_filename_custom(filename):
-            """过滤文件名中的危险字符，仅保留安全字符"""
-            # 移除路径分隔符和特殊字符
-            filename = re.sub(r'[\\/:"*?<>|]+', '_', filename)
-            # 移除前导/尾随空格和点
-            filename = filename.strip().strip('.')
-            # 确保文件名不为空
-            return filename if filename else f"upload_{int(time.time())}"
-        
-        # 处理文件名
-        filename = secure_filename_custom(file.filename)
-        filepath = os.path.join(IMAGE_DIR, filename)
-        
-        # # 避免文件覆盖：如果文件已存在，添加时间戳后缀
-        # if os.path.exists(filepath):
-        #     name, ext = os.path.splitext(filename)
-        #     timestamp = int(time.time())
-        #     filename = f"{name}_{timestamp}{ext}"
-        #     filepath = os.path.join(IMAGE_DIR, filename)
-        
-        # 保存文件
-        file.save(filepath)
-        app.logger.info(f"文件上传成功: {filepath}")
-        
-        return jsonify({
-            "status": "success",
-            "message": f"文件上传成功: {filename}",
-            "filename": filename
-        })
-    except Exception as e:
-        app.logger.error(f"文件上传失败: {str(e)}")
-        return jsonify({
-            "status": "error",
-            "message": f"文件上传失败: {str(e)}"
-        })
+        with open(tmp_path, 'wb') as f:
+            while True:
+                chunk = request.stream.read(image_cache.CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        if digest.hexdigest() != sha256:
+            return jsonify({"status": "error", "message": "镜像内容与SHA-256不一致"})
+        os.replace(tmp_path, os.path.join(AGENT_IMAGE_DIR, sha256 + ext))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    app.logger.info(f"已接收协调节点分发的镜像: {sha256}{ext}")
+    return jsonify({"status": "success", "message": "镜像已接收"})
+
+@app.route('/api/agent/select_image', methods=['POST'])
+def agent_select_image():
+    """将已接收的镜像设为烧录文件"""
+    global OUT_FILE
+    sha256 = (request.json or {}).get("sha256", "")
+    path = _find_agent_image(sha256) if SHA256_PATTERN.match(sha256) else None
+    if path is None:
+        return jsonify({"status": "error", "message": "镜像不存在"})
+    
+    with status_lock:
+        if is_running:
+            # 烧录进行中时不切换镜像（已是该镜像时视为成功）
+            if os.path.abspath(OUT_FILE) == os.path.abspath(path):
+                return jsonify({"status": "success", "message": "镜像未变化"})
+            return jsonify({"status": "error", "message": "烧录进行中，无法切换镜像"})
+        OUT_FILE = path
+    app.logger.info(f"已更新烧录文件为: {OUT_FILE}")
+    return jsonify({"status": "success", "message": f"已选择烧录文件: {os.path.basename(path)}"})
+
+# ======================
+# 协调模式：汇总多个代理节点
+# ======================
+
+def _cluster_result(errors, success_message):
+    """汇总各代理的操作结果"""
+    if not errors:
+        return jsonify({"status": "success", "message": success_message})
+    details = "; ".join(f"{url}: {error}" for url, error in errors.items())
+    return jsonify({
+        "status": "error",
+        "message": f"{len(errors)} 个代理操作失败: {details}",
+        "errors": errors
+    })
+
+@app.route('/api/cluster/agents', methods=['GET'])
+def get_cluster_agents():
+    """获取代理列表"""
+    return jsonify({"status": "success", "agents": [agent.url for agent in cluster_coordinator.agents]})
+
+@app.route('/api/cluster/agents', methods=['POST'])
+def set_cluster_agents():
+    """设置代理列表"""
+    agents = (request.json or {}).get("agents")
+    if not isinstance(agents, list) or not all(isinstance(url, str) and url for url in agents):
+        return jsonify({"status": "error", "message": "请提供代理地址列表"})
+    cluster_coordinator.set_agents(agents)
+    return jsonify({"status": "success", "message": f"已设置 {len(agents)} 个代理"})
+
+@app.route('/api/cluster/status', methods=['GET'])
+def get_cluster_status():
+    """合并所有代理的状态与计数"""
+    return jsonify(cluster_coordinator.merged_status())
+
+@app.route('/api/cluster/start', methods=['POST'])
+def start_cluster():
+    """分发当前烧录文件和芯片型号到所有代理（镜像按内容哈希缓存）并启动烧录"""
+    if not cluster_coordinator.agents:
+        return jsonify({"status": "error", "message": "未配置代理节点"})
+    
+    metadata = get_image_metadata(OUT_FILE)
+    if metadata is None:
+        return jsonify({"status": "error", "message": f"烧录文件不存在: {OUT_FILE}"})
+    image_ok, image_message = check_image_for_chip(OUT_FILE, TARGET_DEVICE_TYPE)
+    if not image_ok:
+        return jsonify({"status": "error", "message": image_message})
     
+    encryption_enabled = (request.json or {}).get('encryptionEnabled', False)
+    errors = cluster_coordinator.start_all(OUT_FILE, metadata["sha256"], TARGET_DEVICE_TYPE, encryption_enabled)
+    return _cluster_result(errors, f"所有 {len(cluster_coordinator.agents)} 个代理烧录已启动")
+
+@app.route('/api/cluster/stop', methods=['POST'])
+def stop_cluster():
+    """停止所有代理的烧录"""
+    return _cluster_result(cluster_coordinator.stop_all(), "所有代理烧录任务已终止")
+
+@app.route('/api/cluster/reset', methods=['POST'])
+def reset_cluster():
+    """重置所有代理的烧录计数"""
+    return _cluster_result(cluster_coordinator.reset_all(), "所有代理烧录计数已重置")
 
 # ======================
 # 程序入口
 # ======================
 
+def parse_args():
+    """命令行参数：单机（默认）、代理或协调模式"""
+    parser = argparse.ArgumentParser(description="UniFlash 多通道烧录")
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口")
+    parser.add_argument("--agent", action="store_true", help="代理模式：供协调节点调用，不打开浏览器")
+    parser.add_argument("--coordinator", nargs="+", metavar="AGENT_URL", help="协调模式：代理节点地址列表")
+    return parser.parse_args()
+
 if __name__ == '__main__':
+    args = parse_args()
+    
     # 输出日志到文件
     app.logger.setLevel(logging.INFO)
     file_handler = logging.FileHandler("app.log", encoding="utf-8")
@@ -863,11 +2400,24 @@ if __name__ == '__main__':
     if not os.path.exists(XDSDFU_PATH):
         app.logger.warning(f"xdsdfu.exe 未找到: {XDSDFU_PATH}")
     
+    if args.coordinator:
+        CLUSTER_AGENTS = args.coordinator
+        cluster_coordinator.set_agents(CLUSTER_AGENTS)
+        app.logger.info(f"协调模式，代理节点: {CLUSTER_AGENTS}")
+    
+    # 代理模式无人值守运行，不使用调试重载
+    debug = not args.agent
+    
+    # 启动烧录器热插拔监视（debug模式下只在实际提供服务的重载子进程中启动）
+    if PROBE_WATCH_INTERVAL > 0 and (not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+        probe_watch.start()
+    
     # 新增：自动打开浏览器（延迟1秒，确保服务已启动）
     def open_browser():
         time.sleep(1)  # 等待服务启动
-        webbrowser.open("http://localhost:5000")  # 打开Flask服务地址
+        webbrowser.open(f"http://localhost:{args.port}")  # 打开Flask服务地址
     
     # 启动一个线程执行打开浏览器的操作（避免阻塞服务启动）
-    threading.Thread(target=open_browser, daemon=True).start()     
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    if not args.agent:
+        threading.Thread(target=open_browser, daemon=True).start()     
+    app.run(host=args.host, port=args.port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import xml.parsers.expat
+from xml.sax.saxutils import quoteattr
+
+# 母版ccxml中烧录器序列号所在的property节点id
+SERIAL_SLOT_ID = "-- Enter the serial number"
+
+
+class CcxmlTemplateError(ValueError):
+    """母版ccxml文件无法解析或未找到序列号位置"""
+
+
+class CcxmlTemplate:
+    """
+    解析后的母版ccxml模板：按XML结构定位序列号property节点的Value属性，
+    渲染时只替换该属性值，其余内容（格式、注释）保持与母版完全一致
+    """
+
+    def __init__(self, prefix: bytes, suffix: bytes, encoding: str):
+        self._prefix = prefix
+        self._suffix = suffix
+        self._encoding = encoding
+
+    @classmethod
+    def from_bytes(cls, content: bytes):
+        """
+        解析母版内容
+        :param content: 母版ccxml文件内容
+        :raises CcxmlTemplateError: XML无效、未找到或找到多个序列号位置
+        """
+        slots = []
+        parser = xml.parsers.expat.ParserCreate()
+
+        def on_start(name, attrs):
+            if attrs.get("id") == SERIAL_SLOT_ID and "Value" in attrs:
+                slots.append(parser.CurrentByteIndex)
+
+        parser.StartElementHandler = on_start
+        try:
+            parser.Parse(content, True)
+        except xml.parsers.expat.ExpatError as e:
+            raise CcxmlTemplateError(f"母版ccxml文件不是有效的XML: {str(e)}")
+
+        if not slots:
+            raise CcxmlTemplateError(f"未找到需要替换的序列号位置（id=\"{SERIAL_SLOT_ID}\"）")
+        if len(slots) > 1:
+            raise CcxmlTemplateError(f"母版中存在{len(slots)}个序列号位置，无法确定替换目标")
+
+        # 在该节点的开始标签内定位Value属性值
+        tag_start = slots[0]
+        tag_end = content.index(b">", tag_start)
+        value_pos = content.find(b"Value=", tag_start, tag_end)
+        if value_pos < 0:
+            raise CcxmlTemplateError("序列号节点缺少Value属性")
+        quote_pos = value_pos + len(b"Value=")
+        quote = content[quote_pos:quote_pos + 1]
+        value_end = content.index(quote, quote_pos + 1)
+
+        # ccxml文件均为UTF-8编码（见XML声明）
+        return cls(content[:quote_pos], content[value_end + 1:], "utf-8")
+
+    def render(self, serial: str) -> bytes:
+        """
+        生成带指定序列号的ccxml内容
+        :param serial: 烧录器序列号
+        """
+        return self._prefix + quoteattr(serial).encode(self._encoding) + self._suffix
+
+
+class CcxmlGenerator:
+    """
+    母版模板缓存 + 增量生成：母版按 (路径, 大小, mtime_ns) 只解析一次；
+    生成文件按内容哈希比较，内容未变化时不重写，写入使用临时文件+替换保证读取方不会读到半个文件
+    """
+
+    def __init__(self):
+        self._templates = {}      # master_path -> ((size, mtime_ns), CcxmlTemplate)
+        self._written_hashes = {}  # output_path -> (sha256, (size, mtime_ns))
+        self._lock = threading.Lock()
+
+    def get_template(self, master_path: str) -> CcxmlTemplate:
+        """
+        获取母版模板，母版文件变化后重新解析
+        :raises FileNotFoundError: 母版不存在
+        :raises CcxmlTemplateError: 母版无法解析
+        """
+        abs_path = os.path.abspath(master_path)
+        st = os.stat(abs_path)
+        signature = (st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            cached = self._templates.get(abs_path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+        with open(abs_path, 'rb') as f:
+            template = CcxmlTemplate.from_bytes(f.read())
+
+        with self._lock:
+            self._templates[abs_path] = (signature, template)
+        return template
+
+    def generate(self, master_path: str, serial: str, output_path: str) -> bool:
+        """
+        生成带序列号的ccxml文件
+        :return: 是否实际写入了文件（内容未变化时返回False）
+        """
+        content = self.get_template(master_path).render(serial)
+        digest = hashlib.sha256(content).hexdigest()
+
+        # 已知文件哈希（按文件签名校验，文件被外部修改后重新读取）
+        known = None
+        try:
+            st = os.stat(output_path)
+            signature = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            signature = None
+        if signature is not None:
+            with self._lock:
+                recorded = self._written_hashes.get(output_path)
+            if recorded is not None and recorded[1] == signature:
+                known = recorded[0]
+            else:
+                with open(output_path, 'rb') as f:
+                    known = hashlib.sha256(f.read()).hexdigest()
+                with self._lock:
+                    self._written_hashes[output_path] = (known, signature)
+        if known == digest:
+            return False
+
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        st = os.stat(output_path)
+        with self._lock:
+            self._written_hashes[output_path] = (digest, (st.st_size, st.st_mtime_ns))
+        return True
+
+    def forget(self, output_path: str):
+        """生成文件被删除后清除其哈希记录"""
+        with self._lock:
+            self._written_hashes.pop(output_path, None)
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+
+
+class ChannelState:
+    """
+    单个通道的状态
+    """
+    __slots__ = ("number", "status", "success", "fail", "progress",
+                 "ccxml_file", "serial", "process", "cancel_event", "version",
+                 "lot_id", "queued_at", "run_steps", "retry_count", "retry_reset", "retry_timer",
+                 "image", "chip_type", "master_ccxml", "snapshot")
+
+    def __init__(self, number, progress):
+        self.number = number
+        self.status = "未开始"
+        self.success = 0
+        self.fail = 0
+        self.progress = progress
+        self.ccxml_file = ""
+        self.serial = ""
+        self.process = None        # 正在运行的dslite进程（Popen）
+        self.cancel_event = None   # 本次烧录的终止标志
+        self.version = 0           # 最后一次变化时的注册表版本号
+        self.lot_id = None         # 本次烧录所属批次
+        self.queued_at = None      # 加入队列的时间
+        self.run_steps = []        # 本次烧录已完成的步骤时间线
+        self.retry_count = 0       # 本次烧录已自动重试的次数
+        self.retry_reset = False   # 下次重试前是否先执行工厂复位
+        self.retry_timer = None    # 等待重试的定时器
+        self.image = None          # 单独分配的镜像路径（None表示使用整站设置，下同）
+        self.chip_type = None      # 单独分配的芯片型号
+        self.master_ccxml = None   # 单独分配的母版ccxml
+        self.snapshot = None       # 本次烧录固定的镜像快照（image_snapshots.ImageSnapshot）
+
+
+class ChannelRegistry:
+    """
+    动态通道注册表：按通道号O(1)查找，通道在首次使用时创建；
+    每次变化递增版本号，可只取出某版本之后变化的通道，总计数与占用通道数增量维护。
+    所有方法需在持有调用方的状态锁时调用。
+    """
+
+    def __init__(self, max_channels, busy_statuses, progress_factory):
+        """
+        :param max_channels: 最大通道数
+        :param busy_statuses: 表示通道被占用（排队或烧录中）的状态
+        :param progress_factory: 生成初始进度字典的函数
+        """
+        self.max_channels = max_channels
+        self._busy_statuses = frozenset(busy_statuses)
+        self._progress_factory = progress_factory
+        self._states = {}
+        self._changes = OrderedDict()  # number -> None，按最后变化时间排序
+        self.version = 0
+        self.total_success = 0
+        self.total_fail = 0
+        self.busy_count = 0
+
+    def get(self, number) -> ChannelState:
+        """
+        获取通道状态，不存在时创建
+        :raises KeyError: 通道号超出范围
+        """
+        state = self._states.get(number)
+        if state is None:
+            if not 1 <= number <= self.max_channels:
+                raise KeyError(f"无效的通道号: {number}")
+            state = ChannelState(number, self._progress_factory())
+            self._states[number] = state
+        return state
+
+    def states(self, limit=None):
+        """按通道号顺序返回已创建的通道（limit限制最大通道号）"""
+        return [self._states[n] for n in sorted(self._states) if limit is None or n <= limit]
+
+    def busy_channels(self):
+        """排队或烧录中的通道号"""
+        return [n for n, state in self._states.items() if state.status in self._busy_statuses]
+
+    @property
+    def any_busy(self) -> bool:
+        return self.busy_count > 0
+
+    def changed_since(self, version, limit=None):
+        """
+        返回版本号之后发生变化的通道，开销与变化通道数成正比
+        :param version: 上次获取时的版本号
+        :param limit: 最大通道号
+        """
+        result = []
+        for number in reversed(self._changes):
+            state = self._states[number]
+            if state.version <= version:
+                break
+            if limit is None or number <= limit:
+                result.append(state)
+        result.reverse()
+        return result
+
+    def touch(self, state):
+        """记录通道发生变化"""
+        self.version += 1
+        state.version = self.version
+        self._changes[state.number] = None
+        self._changes.move_to_end(state.number)
+
+    def set_status(self, number, status):
+        state = self.get(number)
+        was_busy = state.status in self._busy_statuses
+        is_busy = status in self._busy_statuses
+        self.busy_count += int(is_busy) - int(was_busy)
+        state.status = status
+        self.touch(state)
+        return state
+
+    def count_success(self, number):
+        state = self.get(number)
+        state.success += 1
+        self.total_success += 1
+        self.touch(state)
+
+    def count_fail(self, number):
+        state = self.get(number)
+        state.fail += 1
+        self.total_fail += 1
+        self.touch(state)
+
+    def set_progress(self, number, progress):
+        state = self.get(number)
+        state.progress = progress
+        self.touch(state)
+
+    def set_probe(self, number, serial, ccxml_file):
+        state = self.get(number)
+        state.serial = serial
+        state.ccxml_file = ccxml_file
+        self.touch(state)
+
+    def set_target(self, number, image, chip_type, master_ccxml):
+        """设置通道单独分配的烧录目标（None表示使用整站设置）"""
+        state = self.get(number)
+        state.image = image
+        state.chip_type = chip_type
+        state.master_ccxml = master_ccxml
+        self.touch(state)
+
+    def reset_counters(self):
+        """重置所有通道的计数"""
+        for state in self._states.values():
+            if state.success or state.fail:
+                state.success = 0
+                state.fail = 0
+                self.touch(state)
+        self.total_success = 0
+        self.total_fail = 0
@@ -0,0 +1,244 @@
+# 多主机分布式烧录：协调节点 -> 代理节点
+#
+# 每台主机以代理模式运行本程序（python app.py --agent --port 5001），通过HTTP开放本机通道；
+# 协调节点（python app.py --coordinator http://host1:5001 http://host2:5001）汇总各代理：
+#   - 镜像按SHA-256分发，代理已有相同内容时不重复上传（PUT /api/agent/images/<sha256>）
+#   - 启动、停止、重置计数广播到所有代理
+#   - 合并各代理的状态与计数，通道按代理顺序连续编号
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class AgentError(Exception):
+    """代理节点无法连接或返回错误"""
+
+
+class AgentClient:
+    """
+    单个代理节点的HTTP客户端（仅使用标准库）
+    """
+
+    def __init__(self, url, timeout=5):
+        """
+        :param url: 代理地址，如 http://192.168.1.10:5001
+        :param timeout: 请求超时时间（秒）
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None, data=None, headers=None, timeout=None) -> dict:
+        headers = dict(headers or {})
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.url + path, data=data, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=timeout or self.timeout) as resp:
+                body = resp.read()
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            if e.code != 404:
+                raise AgentError(f"返回HTTP {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            raise AgentError(f"无法连接: {str(e)}")
+        try:
+            return json.loads(body)
+        except ValueError:
+            raise AgentError("返回了无效的响应")
+
+    def _command(self, method, path, payload=None, **kwargs) -> dict:
+        result = self._request(method, path, payload=payload, **kwargs)
+        if result.get("status") != "success":
+            raise AgentError(result.get("message", "操作失败"))
+        return result
+
+    def status(self) -> dict:
+        return self._request("GET", "/api/status")
+
+    def has_image(self, sha256) -> bool:
+        return self._request("GET", f"/api/agent/images/{sha256}").get("status") == "success"
+
+    def upload_image(self, path, sha256, timeout=120):
+        """流式上传镜像（不整体读入内存）"""
+        filename = urllib.parse.quote(os.path.basename(path))
+        try:
+            f = open(path, 'rb')
+            size = os.fstat(f.fileno()).st_size
+        except OSError as e:
+            raise AgentError(f"读取镜像失败: {str(e)}")
+        with f:
+            self._command(
+                "PUT", f"/api/agent/images/{sha256}?filename={filename}",
+                data=f,
+                headers={
+                    "Content-Type": "application/octet-stream",
+                    "Content-Length": str(size)
+                },
+                timeout=timeout
+            )
+
+    def select_image(self, sha256):
+        self._command("POST", "/api/agent/select_image", {"sha256": sha256})
+
+    def set_chip_type(self, chip_type):
+        self._command("POST", "/api/set_chip_type", {"chip_type": chip_type})
+
+    def start(self, encryption_enabled):
+        return self._command("POST", "/api/start", {"encryptionEnabled": encryption_enabled})
+
+    def stop(self):
+        return self._command("POST", "/api/stop", {})
+
+    def reset(self):
+        return self._command("POST", "/api/reset", {})
+
+
+class Coordinator:
+    """
+    协调节点：并行操作所有代理并合并结果
+    """
+
+    def __init__(self, agent_urls=(), timeout=5, max_workers=16):
+        """
+        :param agent_urls: 代理地址列表
+        :param timeout: 请求超时时间（秒）
+        :param max_workers: 并行请求的线程数
+        """
+        self._timeout = timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cluster")
+        self._lock = threading.Lock()
+        self._agents = []
+        self._known_images = {}  # 代理地址 -> 已确认存在的镜像SHA-256集合
+        self.set_agents(agent_urls)
+
+    @property
+    def agents(self):
+        with self._lock:
+            return list(self._agents)
+
+    def set_agents(self, agent_urls):
+        """设置代理列表（保留已有代理的镜像缓存记录）"""
+        with self._lock:
+            self._agents = [AgentClient(url, self._timeout) for url in agent_urls]
+            urls = {agent.url for agent in self._agents}
+            self._known_images = {url: shas for url, shas in self._known_images.items() if url in urls}
+
+    def _map(self, func):
+        """
+        对所有代理并行执行func(agent)
+        :return: [(代理, 结果, 错误信息)]，按代理顺序；单个代理的任何异常都只记为该代理的错误
+        """
+        agents = self.agents
+        futures = [self._executor.submit(func, agent) for agent in agents]
+        results = []
+        for agent, future in zip(agents, futures):
+            try:
+                results.append((agent, future.result(), None))
+            except AgentError as e:
+                results.append((agent, None, str(e)))
+            except Exception as e:
+                logging.getLogger(__name__).exception(f"代理 {agent.url} 操作异常")
+                results.append((agent, None, f"操作异常: {str(e)}"))
+        return results
+
+    def _ensure_image(self, agent, path, sha256):
+        """保证代理上存在该镜像并选为烧录文件：先查本地记录，再询问代理，都没有时才上传"""
+        with self._lock:
+            known = sha256 in self._known_images.get(agent.url, ())
+        if not known and not agent.has_image(sha256):
+            agent.upload_image(path, sha256)
+        with self._lock:
+            self._known_images.setdefault(agent.url, set()).add(sha256)
+        agent.select_image(sha256)
+
+    def distribute_image(self, path, sha256):
+        """
+        分发镜像到所有代理
+        :return: {代理地址: 错误信息}（全部成功时为空）
+        """
+        results = self._map(lambda agent: self._ensure_image(agent, path, sha256))
+        return {agent.url: error for agent, _, error in results if error}
+
+    def start_all(self, path, sha256, chip_type, encryption_enabled):
+        """
+        分发镜像、同步芯片型号后在所有代理上启动烧录
+        :return: {代理地址: 错误信息}
+        """
+        def start(agent):
+            try:
+                self._ensure_image(agent, path, sha256)
+            except Exception:
+                # 代理重启后镜像可能已被清理，清除记录下次重新确认
+                with self._lock:
+                    self._known_images.get(agent.url, set()).discard(sha256)
+                raise
+            agent.set_chip_type(chip_type)
+            return agent.start(encryption_enabled)
+
+        return {agent.url: error for agent, _, error in self._map(start) if error}
+
+    def stop_all(self):
+        return {agent.url: error for agent, _, error in self._map(lambda agent: agent.stop()) if error}
+
+    def reset_all(self):
+        return {agent.url: error for agent, _, error in self._map(lambda agent: agent.reset()) if error}
+
+    def merged_status(self) -> dict:
+        """
+        合并各代理状态：通道按代理顺序连续编号（代理1的通道1..n，代理2从n+1开始）
+        """
+        merged = {
+            "is_running": False,
+            "num_channels": 0,
+            "total_success": 0,
+            "total_fail": 0,
+            "queue_depth": 0,
+            "channels": {},
+            "counters": {"success": {}, "fail": {}},
+            "progress": {},
+            "channel_serials": {},
+            "agents": []
+        }
+
+        offset = 0
+        for agent, status, error in self._map(lambda agent: agent.status()):
+            if error:
+                merged["agents"].append({"url": agent.url, "online": False, "error": error})
+                continue
+
+            num_channels = status.get("num_channels", 0)
+            merged["agents"].append({
+                "url": agent.url,
+                "online": True,
+                "offset": offset,
+                "num_channels": num_channels,
+                "is_running": status.get("is_running", False),
+                "total_success": status.get("total_success", 0),
+                "total_fail": status.get("total_fail", 0),
+                "serials": status.get("serials", [])
+            })
+            merged["is_running"] = merged["is_running"] or status.get("is_running", False)
+            merged["total_success"] += status.get("total_success", 0)
+            merged["total_fail"] += status.get("total_fail", 0)
+            merged["queue_depth"] += status.get("queue_depth", 0)
+
+            counters = status.get("counters", {})
+            for key, value in status.get("channels", {}).items():
+                channel = offset + int(key)
+                merged["channels"][channel] = value
+                merged["counters"]["success"][channel] = counters.get("success", {}).get(key, 0)
+                merged["counters"]["fail"][channel] = counters.get("fail", {}).get(key, 0)
+                merged["progress"][channel] = status.get("progress", {}).get(key)
+                serial = status.get("channel_serials", {}).get(key)
+                if serial:
+                    merged["channel_serials"][channel] = serial
+            offset += num_channels
+
+        merged["num_channels"] = offset
+        return merged
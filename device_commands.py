@@ -14,4 +14,24 @@ def get_chip_series(chip_model: str) -> str:
     elif chip_model_upper.startswith("MSP"):
         return "MSP"
     else:
-        return ""
\ No newline at end of file
+        return ""
+
+def get_chip_architecture(chip_model: str) -> str:
+    """
+    根据芯片型号判断CPU架构（用于校验镜像是否与芯片匹配）
+    :param chip_model: 芯片型号字符串 (如 F28P55, MSPM0G5187)
+    :return: C28x / ARM / MSP430 / 空字符串
+    """
+    if not chip_model:
+        return ""
+    
+    chip_model_upper = chip_model.upper()
+    
+    if chip_model_upper.startswith("F28"):
+        return "C28x"
+    elif chip_model_upper.startswith("MSPM0"):
+        return "ARM"
+    elif chip_model_upper.startswith("MSP430"):
+        return "MSP430"
+    else:
+        return ""
@@ -0,0 +1,69 @@
+import re
+
+# 失败类别（key）与显示名称
+FAILURE_LABELS = {
+    "probe_not_found": "未找到烧录器",
+    "target_not_responding": "目标无响应",
+    "device_locked": "芯片已锁定",
+    "verify_mismatch": "校验不一致",
+    "timeout": "超时",
+    "cancelled": "已终止",
+    "config": "配置错误",
+    "session": "调试会话错误",
+    "unknown": "未知错误",
+}
+
+# dslite输出关键字 -> 失败类别（按顺序匹配，先匹配到的优先）
+# "Failed: Unknown error" 是MSP芯片上锁时dslite实际输出的错误信息（原烧录流程即以此判断锁定）
+_FAILURE_PATTERNS = [
+    (re.compile(r"failed: unknown error|device is locked|is secured|flash is locked|dcsm.*lock", re.I),
+     "device_locked"),
+    (re.compile(r"verification failed|verify failed|mismatch", re.I), "verify_mismatch"),
+    (re.compile(r"xds110.*(not found|could not be found|failed)|cannot (find|connect to) the (debug )?probe"
+                r"|no (debug )?probe|unable to (find|open) (the )?(debug )?probe|serial number.*not found", re.I),
+     "probe_not_found"),
+    (re.compile(r"target (is )?not responding|error connecting to the target|unable to access (the )?(device|dap)"
+                r"|cannot access the dap", re.I), "target_not_responding"),
+    (re.compile(r"timed out|timeout", re.I), "timeout"),
+]
+
+# 分类时读取输出文件末尾的字节数
+TAIL_BYTES = 16 * 1024
+
+
+def get_failure_label(failure_class: str) -> str:
+    """
+    获取失败类别的显示名称
+    :param failure_class: 失败类别
+    :return: 中文显示名称
+    """
+    return FAILURE_LABELS.get(failure_class, failure_class)
+
+
+def classify_output(text: str) -> str:
+    """
+    根据dslite输出判断失败类别
+    :param text: dslite输出内容
+    :return: 失败类别，无法判断时返回"unknown"
+    """
+    for pattern, failure_class in _FAILURE_PATTERNS:
+        if pattern.search(text):
+            return failure_class
+    return "unknown"
+
+
+def classify_file(path: str) -> str:
+    """
+    根据dslite输出文件末尾内容判断失败类别
+    :param path: 输出文件路径
+    :return: 失败类别
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            size = f.tell()
+            f.seek(max(0, size - TAIL_BYTES))
+            text = f.read().decode('utf-8', errors='ignore')
+    except OSError:
+        return "unknown"
+    return classify_output(text)
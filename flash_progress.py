@@ -0,0 +1,118 @@
+import re
+import time
+
+# 烧录阶段标识（key）与前端显示名称
+PHASE_LABELS = {
+    "": "",
+    "configure": "配置调试器",
+    "connect": "连接目标",
+    "load": "加载程序",
+    "erase": "擦除Flash",
+    "program": "写入程序",
+    "verify": "校验程序",
+    "operation": "执行操作",
+    "done": "完成",
+}
+
+# 行首关键字 -> 阶段
+_PHASE_PATTERNS = [
+    (re.compile(r"^Configuring Debugger"), "configure"),
+    (re.compile(r"^Connecting"), "connect"),
+    (re.compile(r"^Loading Program"), "load"),
+    (re.compile(r"^Erasing Flash|^Erasing Bank"), "erase"),
+    (re.compile(r"^Verifying Program"), "verify"),
+    (re.compile(r"^Running Operation"), "operation"),
+    (re.compile(r"^Success\s*$"), "done"),
+]
+
+# 段写入行，如 ".text: 0 of 10484 at 0x80470: 17%" 或 "PT_LOAD[2]: 0 of 184 at 0x41c00000: 65%"
+_SECTION_PATTERN = re.compile(r"^(\.\w+|PT_LOAD\[\d+\]):\s+\d+\s+of\s+\d+\s+at\s+0x[0-9A-Fa-f]+")
+
+# 行尾百分比，如 "Erasing Bank 3: 60%"
+_PERCENT_PATTERN = re.compile(r":\s*(\d{1,3})%\s*$")
+
+
+def get_phase_label(phase: str) -> str:
+    """
+    获取阶段的显示名称
+    :param phase: 阶段标识
+    :return: 中文显示名称
+    """
+    return PHASE_LABELS.get(phase, phase)
+
+
+class ProgressParser:
+    """
+    dslite输出的流式解析器：逐行喂入输出，实时维护当前阶段和百分比，并记录各阶段的起止时间
+    """
+
+    def __init__(self, clock=time.time):
+        """
+        :param clock: 时间函数（秒）
+        """
+        self.phase = ""
+        self.percent = 0
+        self._clock = clock
+        self.spans = []  # [阶段, 开始时间, 结束时间]，结束时间为None表示进行中
+
+    def feed(self, line: str) -> bool:
+        """
+        解析一行dslite输出
+        :param line: 输出行（可带换行符和缩进）
+        :return: 阶段或百分比是否发生变化
+        """
+        text = line.strip()
+        if not text:
+            return False
+
+        old = (self.phase, self.percent)
+
+        new_phase = None
+        for pattern, phase in _PHASE_PATTERNS:
+            if pattern.search(text):
+                new_phase = phase
+                break
+
+        # 擦除结束后出现的段写入行属于写入阶段；加载阶段的段写入行同理
+        if new_phase is None and _SECTION_PATTERN.search(text) and self.phase in ("load", "erase"):
+            new_phase = "program"
+
+        if new_phase is not None and new_phase != self.phase:
+            self._close_span()
+            if new_phase != "done":
+                self.spans.append([new_phase, self._clock(), None])
+            self.phase = new_phase
+            self.percent = 100 if new_phase == "done" else 0
+
+        match = _PERCENT_PATTERN.search(text)
+        if match:
+            self.percent = min(int(match.group(1)), 100)
+
+        return (self.phase, self.percent) != old
+
+    def _close_span(self):
+        if self.spans and self.spans[-1][2] is None:
+            self.spans[-1][2] = self._clock()
+
+    def finish(self):
+        """输出结束（进程退出）时调用，结束当前阶段的计时"""
+        self._close_span()
+
+    def phase_durations(self) -> dict:
+        """
+        各阶段耗时
+        :return: {阶段: 秒}，进行中的阶段计算到当前时间
+        """
+        now = self._clock()
+        durations = {}
+        for phase, start, end in self.spans:
+            durations[phase] = durations.get(phase, 0.0) + ((end if end is not None else now) - start)
+        return durations
+
+    def snapshot(self) -> dict:
+        """返回当前进度的字典表示"""
+        return {
+            "phase": self.phase,
+            "phase_label": get_phase_label(self.phase),
+            "percent": self.percent,
+        }
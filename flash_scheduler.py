@@ -0,0 +1,128 @@
+import logging
+import threading
+from collections import OrderedDict
+
+
+class FlashScheduler:
+    """
+    烧录任务调度器：任务队列 + 工作线程池，限制同时运行的dslite进程数量。
+    每个通道同一时刻最多只有一个排队中的任务和一个运行中的任务；处理函数发布最终状态后、
+    返回前即可再次提交该通道，新任务在上一个任务返回后才开始执行。
+    """
+
+    def __init__(self, handler, max_workers=4, name="flash-worker"):
+        """
+        :param handler: 任务处理函数，签名为 handler(channel, *args)
+        :param max_workers: 最大并发数
+        :param name: 工作线程名称前缀
+        """
+        self._handler = handler
+        self._name = name
+        self._max_workers = max(1, int(max_workers))
+        self._pending = OrderedDict()  # channel -> args，保持提交顺序
+        self._active = set()           # 正在执行的通道
+        self._worker_count = 0
+        self._cond = threading.Condition()
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def set_max_workers(self, max_workers: int):
+        """
+        调整最大并发数：调大时立即补充工作线程，调小时多余线程在当前任务完成后退出
+        :param max_workers: 新的最大并发数
+        """
+        with self._cond:
+            self._max_workers = max(1, int(max_workers))
+            self._spawn_workers()
+            self._cond.notify_all()
+
+    def submit(self, channel, *args) -> bool:
+        """
+        提交通道烧录任务
+        :param channel: 通道号
+        :return: 是否提交成功（通道已在排队时返回False）
+        """
+        with self._cond:
+            if channel in self._pending:
+                return False
+            self._pending[channel] = args
+            self._spawn_workers()
+            self._cond.notify()
+            return True
+
+    def cancel_pending(self, channel=None) -> list:
+        """
+        取消排队中的任务（不影响正在执行的任务）
+        :param channel: 通道号，为None时取消全部
+        :return: 被取消的通道列表
+        """
+        with self._cond:
+            if channel is None:
+                cancelled = list(self._pending.keys())
+                self._pending.clear()
+            elif channel in self._pending:
+                del self._pending[channel]
+                cancelled = [channel]
+            else:
+                cancelled = []
+            return cancelled
+
+    def is_busy(self, channel) -> bool:
+        """通道是否有排队或运行中的任务"""
+        with self._cond:
+            return channel in self._pending or channel in self._active
+
+    def pending_count(self) -> int:
+        """排队中的任务数"""
+        with self._cond:
+            return len(self._pending)
+
+    def active_count(self) -> int:
+        """运行中的任务数"""
+        with self._cond:
+            return len(self._active)
+
+    def _spawn_workers(self):
+        """按需补充工作线程（需在持有_cond时调用）"""
+        needed = min(self._max_workers, len(self._active | self._pending.keys()))
+        while self._worker_count < needed:
+            self._worker_count += 1
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"{self._name}-{self._worker_count}",
+                daemon=True
+            )
+            thread.start()
+
+    def _next_runnable(self):
+        """最早提交且该通道没有运行中任务的排队任务（需在持有_cond时调用）"""
+        return next((channel for channel in self._pending if channel not in self._active), None)
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                channel = self._next_runnable()
+                while channel is None:
+                    if self._worker_count > self._max_workers:
+                        break
+                    # 空闲线程不常驻，没有任务时退出
+                    timed_out = not self._cond.wait(timeout=5)
+                    channel = self._next_runnable()
+                    if timed_out and channel is None:
+                        break
+                if channel is None or self._worker_count > self._max_workers:
+                    self._worker_count -= 1
+                    return
+                args = self._pending.pop(channel)
+                self._active.add(channel)
+
+            try:
+                self._handler(channel, *args)
+            except Exception:
+                logging.getLogger(__name__).exception(f"通道 {channel} 任务执行异常")
+            finally:
+                with self._cond:
+                    self._active.discard(channel)
+                    self._cond.notify_all()
@@ -0,0 +1,160 @@
+# 烧录批次（lot）时间线：记录每个通道每次烧录的排队、各步骤及dslite各阶段的起止时间，
+# 可导出为Chrome Trace（chrome://tracing / Perfetto）JSON，每个通道一条轨道。
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import flash_progress
+
+# 步骤显示名称
+STEP_LABELS = {
+    "queue": "排队",
+    "factory_reset": "工厂复位",
+    "precheck": "预校验",
+    "burn": "烧录",
+    "session": "调试会话",
+}
+
+
+class FlashTimeline:
+    """
+    批次时间线存储：内存中保留最近的批次，每次烧录结束后写入 <目录>/<批次号>.json
+    """
+
+    def __init__(self, directory, max_lots=20):
+        """
+        :param directory: 时间线文件存放目录
+        :param max_lots: 内存中保留的批次数
+        """
+        self.directory = directory
+        self._max_lots = max_lots
+        self._lots = OrderedDict()  # 批次号 -> 批次数据
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # 多个通道同时结束时串行写文件，保证文件中是最新内容
+
+    def begin_lot(self, description="") -> str:
+        """
+        开始新批次
+        :param description: 批次说明（如镜像文件名）
+        :return: 批次号
+        """
+        started = time.time()
+        lot_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(started)) + f"-{int(started * 1000) % 1000:03d}"
+        with self._lock:
+            self._lots[lot_id] = {
+                "lot_id": lot_id,
+                "description": description,
+                "started": started,
+                "runs": []
+            }
+            while len(self._lots) > self._max_lots:
+                self._lots.popitem(last=False)
+        return lot_id
+
+    def add_run(self, lot_id, channel, run):
+        """
+        记录一次通道烧录
+        :param lot_id: 批次号
+        :param channel: 通道号
+        :param run: {"queued", "start", "end", "result", "failure_class", "steps": [{"step", "start", "end", "phases": [[阶段, 开始, 结束], ...]}]}
+        """
+        with self._lock:
+            lot = self._lots.get(lot_id)
+            if lot is None:
+                return
+            lot["runs"].append(dict(run, channel=channel))
+        with self._save_lock:
+            with self._lock:
+                content = json.dumps(lot, ensure_ascii=False)
+            self._save(lot_id, content)
+
+    def _save(self, lot_id, content):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{lot_id}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def get_lot(self, lot_id):
+        """获取批次数据，内存中没有时从文件读取，不存在时返回None"""
+        with self._lock:
+            lot = self._lots.get(lot_id)
+            if lot is not None:
+                return json.loads(json.dumps(lot))
+        path = os.path.join(self.directory, f"{os.path.basename(lot_id)}.json")
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def latest_lot_id(self):
+        with self._lock:
+            return next(reversed(self._lots), None)
+
+    def list_lots(self) -> list:
+        """最近批次的概要（新批次在前）"""
+        with self._lock:
+            lots = list(self._lots.values())
+        summaries = []
+        for lot in reversed(lots):
+            runs = lot["runs"]
+            summaries.append({
+                "lot_id": lot["lot_id"],
+                "description": lot["description"],
+                "started": lot["started"],
+                "runs": len(runs),
+                "success": sum(1 for run in runs if run.get("result") in ("success", "skipped")),
+                "fail": sum(1 for run in runs if run.get("result") == "failure"),
+            })
+        return summaries
+
+
+def to_chrome_trace(lot) -> dict:
+    """
+    批次数据转换为Chrome Trace格式（时间单位微秒，相对批次开始时间）
+    :param lot: get_lot返回的批次数据
+    """
+    origin = lot["started"]
+
+    def us(t):
+        return round((t - origin) * 1e6)
+
+    events = [{
+        "name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+        "args": {"name": f"批次 {lot['lot_id']} {lot.get('description', '')}".strip()}
+    }]
+
+    channels = sorted({run["channel"] for run in lot["runs"]})
+    for channel in channels:
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": channel, "args": {"name": f"通道 {channel}"}})
+        events.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": channel, "args": {"sort_index": channel}})
+
+    for run in lot["runs"]:
+        channel = run["channel"]
+        if run.get("queued") is not None and run["queued"] < run["start"]:
+            events.append({
+                "name": STEP_LABELS["queue"], "cat": "queue", "ph": "X", "pid": 1, "tid": channel,
+                "ts": us(run["queued"]), "dur": us(run["start"]) - us(run["queued"])
+            })
+        events.append({
+            "name": f"烧录 ({run.get('result', '')})", "cat": "run", "ph": "X", "pid": 1, "tid": channel,
+            "ts": us(run["start"]), "dur": us(run["end"]) - us(run["start"]),
+            "args": {"result": run.get("result"), "failure_class": run.get("failure_class")}
+        })
+        for step in run.get("steps", []):
+            events.append({
+                "name": STEP_LABELS.get(step["step"], step["step"]), "cat": "step", "ph": "X", "pid": 1, "tid": channel,
+                "ts": us(step["start"]), "dur": us(step["end"]) - us(step["start"])
+            })
+            for phase, start, end in step.get("phases", []):
+                end = end if end is not None else step["end"]
+                events.append({
+                    "name": flash_progress.get_phase_label(phase), "cat": "phase", "ph": "X", "pid": 1, "tid": channel,
+                    "ts": us(start), "dur": us(end) - us(start), "args": {"phase": phase}
+                })
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
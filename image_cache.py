@@ -0,0 +1,102 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+import image_format
+
+# 文件读取块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+def compute_image_metadata(path: str, stat_result=None) -> dict:
+    """
+    单次读取文件，同时计算CRC32和SHA-256，并解析镜像结构
+    :param path: 文件路径
+    :param stat_result: 已获取的os.stat结果（可选）
+    :return: 元数据字典
+    """
+    st = stat_result or os.stat(path)
+    crc = 0
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+            crc = zlib.crc32(data, crc)
+            sha256.update(data)
+
+    # 解析ELF/COFF结构；非镜像文件（如.hex）记录错误信息
+    try:
+        image_info = image_format.parse_image(path)
+        image_error = None
+    except (image_format.ImageFormatError, OSError) as e:
+        image_info = None
+        image_error = str(e)
+
+    return {
+        "path": path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "crc32": f"{crc & 0xFFFFFFFF:08X}",
+        "sha256": sha256.hexdigest(),
+        "image_info": image_info,
+        "image_error": image_error,
+    }
+
+
+class ImageMetadataCache:
+    """
+    进程级镜像元数据缓存，以 (绝对路径, 大小, mtime_ns) 为键，文件变化后自动失效，按LRU淘汰
+    """
+
+    def __init__(self, max_entries=32):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()  # (path, size, mtime_ns) -> metadata
+        self._lock = threading.Lock()
+
+    def get(self, path: str):
+        """
+        获取文件元数据，命中缓存时不读取文件内容
+        :param path: 文件路径
+        :return: 元数据字典（副本），文件不存在时返回None
+        """
+        abs_path = os.path.abspath(path)
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            self.invalidate(abs_path)
+            return None
+
+        key = (abs_path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            metadata = self._entries.get(key)
+            if metadata is not None:
+                self._entries.move_to_end(key)
+                return dict(metadata)
+
+        metadata = compute_image_metadata(abs_path, st)
+
+        with self._lock:
+            # 同一路径的旧版本条目失效
+            for stale_key in [k for k in self._entries if k[0] == abs_path]:
+                del self._entries[stale_key]
+            self._entries[key] = metadata
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return dict(metadata)
+
+    def invalidate(self, path: str = None):
+        """
+        使缓存失效
+        :param path: 文件路径，为None时清空全部
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            abs_path = os.path.abspath(path)
+            for stale_key in [k for k in self._entries if k[0] == abs_path]:
+                del self._entries[stale_key]
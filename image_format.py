@@ -0,0 +1,218 @@
+import mmap
+import struct
+
+# ======================
+# 目标架构
+# ======================
+
+# ELF e_machine -> (名称, 架构)
+ELF_MACHINES = {
+    40: ("ARM", "ARM"),
+    105: ("TI MSP430", "MSP430"),
+    141: ("TI C2000", "C28x"),
+}
+
+# TI COFF target id -> (名称, 架构)
+COFF_TARGETS = {
+    0x0097: ("TI ARM (TMS470)", "ARM"),
+    0x0099: ("TI C2000", "C28x"),
+    0x00A0: ("TI MSP430", "MSP430"),
+}
+
+# ======================
+# ELF常量
+# ======================
+
+PT_LOAD = 1
+SHT_NOBITS = 8
+SHF_ALLOC = 0x2
+
+# ======================
+# TI COFF常量
+# ======================
+
+COFF_VERSION_2 = 0x00C2
+COFF_FILE_HEADER_SIZE = 22
+COFF_SECTION_HEADER_SIZE = 48
+# 不需要写入Flash的段：DSECT / NOLOAD / COPY / BSS
+COFF_NOLOAD_FLAGS = 0x01 | 0x02 | 0x10 | 0x80
+
+
+class ImageFormatError(ValueError):
+    """镜像文件格式错误"""
+
+
+def parse_image(path: str) -> dict:
+    """
+    解析烧录镜像（ELF或TI COFF），通过mmap读取，不复制整个文件
+    :param path: 镜像文件路径
+    :return: 镜像信息字典（格式、目标架构、入口地址、可加载段、需写入的总字节数）
+    :raises ImageFormatError: 无法识别或文件损坏
+    """
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ImageFormatError("文件为空")
+        with mm:
+            if mm[:4] == b"\x7fELF":
+                return _parse_elf(mm)
+            if len(mm) >= 2 and struct.unpack_from("<H", mm, 0)[0] == COFF_VERSION_2:
+                return _parse_ti_coff(mm)
+            raise ImageFormatError("无法识别的镜像格式（仅支持ELF和TI COFF）")
+
+
+def _read_cstring(buf, offset: int) -> str:
+    end = buf.find(b"\x00", offset)
+    if end < 0:
+        end = len(buf)
+    return buf[offset:end].decode('ascii', errors='replace')
+
+
+def _parse_elf(mm) -> dict:
+    if len(mm) < 52:
+        raise ImageFormatError("ELF文件头不完整")
+
+    ei_class = mm[4]
+    ei_data = mm[5]
+    if ei_class not in (1, 2) or ei_data not in (1, 2):
+        raise ImageFormatError("无效的ELF标识")
+    is_64 = ei_class == 2
+    endian = "<" if ei_data == 1 else ">"
+
+    try:
+        if is_64:
+            (e_type, e_machine, _, e_entry, e_phoff, e_shoff, _, _,
+             e_phentsize, e_phnum, e_shentsize, e_shnum, e_shstrndx) = struct.unpack_from(endian + "HHIQQQIHHHHHH", mm, 16)
+        else:
+            (e_type, e_machine, _, e_entry, e_phoff, e_shoff, _, _,
+             e_phentsize, e_phnum, e_shentsize, e_shnum, e_shstrndx) = struct.unpack_from(endian + "HHIIIIIHHHHHH", mm, 16)
+
+        # 程序头：可加载段
+        segments = []
+        for i in range(e_phnum):
+            offset = e_phoff + i * e_phentsize
+            if is_64:
+                p_type, p_flags, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, _ = struct.unpack_from(endian + "IIQQQQQQ", mm, offset)
+            else:
+                p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags, _ = struct.unpack_from(endian + "IIIIIIII", mm, offset)
+            if p_type != PT_LOAD:
+                continue
+            segments.append({
+                "index": i,
+                "vaddr": p_vaddr,
+                "paddr": p_paddr,
+                "offset": p_offset,
+                "filesz": p_filesz,
+                "memsz": p_memsz,
+                "flags": p_flags,
+            })
+
+        # 节头：分配了地址且有文件内容的节
+        sections = []
+        if e_shoff and e_shnum:
+            headers = []
+            for i in range(e_shnum):
+                offset = e_shoff + i * e_shentsize
+                if is_64:
+                    sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size = struct.unpack_from(endian + "IIQQQQ", mm, offset)
+                else:
+                    sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size = struct.unpack_from(endian + "IIIIII", mm, offset)
+                headers.append((sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size))
+
+            strtab_offset = headers[e_shstrndx][4] if e_shstrndx < len(headers) else None
+            for sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size in headers:
+                if not (sh_flags & SHF_ALLOC) or sh_type == SHT_NOBITS or sh_size == 0:
+                    continue
+                name = _read_cstring(mm, strtab_offset + sh_name) if strtab_offset is not None else ""
+                sections.append({
+                    "name": name,
+                    "address": sh_addr,
+                    "offset": sh_offset,
+                    "size": sh_size,
+                })
+    except struct.error:
+        raise ImageFormatError("ELF文件已损坏或被截断")
+
+    machine_name, architecture = ELF_MACHINES.get(e_machine, (f"未知({e_machine})", ""))
+    program_bytes = sum(seg["filesz"] for seg in segments) or sum(sec["size"] for sec in sections)
+
+    return {
+        "format": "ELF64" if is_64 else "ELF32",
+        "machine": e_machine,
+        "machine_name": machine_name,
+        "architecture": architecture,
+        "entry": e_entry,
+        "segments": segments,
+        "sections": sections,
+        "program_bytes": program_bytes,
+        "build_time": None,  # ELF头中没有生成时间
+    }
+
+
+def _parse_ti_coff(mm) -> dict:
+    try:
+        (_, nscns, timestamp, _, _, opthdr_size, _, target_id) = struct.unpack_from("<HHiiiHHH", mm, 0)
+
+        # 可选头（a.out头）中的入口地址
+        entry = None
+        if opthdr_size >= 28:
+            entry = struct.unpack_from("<I", mm, COFF_FILE_HEADER_SIZE + 16)[0]
+
+        sections = []
+        section_base = COFF_FILE_HEADER_SIZE + opthdr_size
+        for i in range(nscns):
+            offset = section_base + i * COFF_SECTION_HEADER_SIZE
+            raw_name = mm[offset:offset + 8]
+            paddr, _, size, scnptr = struct.unpack_from("<IIII", mm, offset + 8)
+            flags = struct.unpack_from("<I", mm, offset + 40)[0]
+            if size == 0 or scnptr == 0 or (flags & COFF_NOLOAD_FLAGS):
+                continue
+
+            # 名称长度超过8字节时存放在字符串表中
+            if raw_name[:4] == b"\x00\x00\x00\x00":
+                name = f"<strtab+{struct.unpack_from('<I', raw_name, 4)[0]}>"
+            else:
+                name = raw_name.rstrip(b"\x00").decode('ascii', errors='replace')
+
+            sections.append({
+                "name": name,
+                "address": paddr,
+                "offset": scnptr,
+                "size": size,
+            })
+    except struct.error:
+        raise ImageFormatError("COFF文件已损坏或被截断")
+
+    machine_name, architecture = COFF_TARGETS.get(target_id, (f"未知(0x{target_id:04X})", ""))
+
+    return {
+        "format": "TI-COFF",
+        "machine": target_id,
+        "machine_name": machine_name,
+        "architecture": architecture,
+        "entry": entry,
+        "segments": [],
+        "sections": sections,
+        "program_bytes": sum(sec["size"] for sec in sections),
+        "build_time": timestamp if timestamp > 0 else None,  # 文件头中的生成时间（Unix时间戳）
+    }
+
+
+def summarize(info: dict) -> dict:
+    """
+    生成供前端显示的镜像摘要
+    :param info: parse_image返回的镜像信息
+    :return: 摘要字典
+    """
+    return {
+        "format": info["format"],
+        "machine_name": info["machine_name"],
+        "architecture": info["architecture"],
+        "entry": f"0x{info['entry']:X}" if info["entry"] is not None else None,
+        "program_bytes": info["program_bytes"],
+        "load_regions": [
+            {"name": sec["name"], "address": f"0x{sec['address']:X}", "size": sec["size"]}
+            for sec in info["sections"]
+        ],
+    }
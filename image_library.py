@@ -0,0 +1,185 @@
+# 镜像库索引：记录image目录中每个镜像的大小、哈希、目标架构、生成时间和段摘要，保存在索引文件中。
+# 刷新时只对新增或大小/修改时间变化的文件读取内容；目录修改时间未变化时不重新扫描，
+# 仅按较长间隔检查一次各文件（发现原地改写的文件）。
+import json
+import os
+import threading
+import time
+
+import image_cache
+import image_format
+
+# 镜像库收录的文件类型
+IMAGE_EXTENSIONS = (".out", ".hex")
+
+# 索引文件格式版本，字段变化时递增（旧索引将被重建）
+INDEX_VERSION = 1
+
+# 排序字段
+SORT_KEYS = {
+    "name": lambda item: item["name"].lower(),
+    "mtime": lambda item: item["mtime"],
+    "size": lambda item: item["size"],
+    "last_flashed": lambda item: item.get("last_flashed") or 0,
+}
+
+
+def _build_entry(path, st):
+    """读取文件内容生成索引条目"""
+    metadata = image_cache.compute_image_metadata(path, st)
+    info = metadata["image_info"]
+    summary = image_format.summarize(info) if info else None
+    return {
+        "name": os.path.basename(path),
+        "ext": os.path.splitext(path)[1].lower(),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "mtime": st.st_mtime,
+        "crc32": metadata["crc32"],
+        "sha256": metadata["sha256"],
+        "format": summary["format"] if summary else None,
+        "machine_name": summary["machine_name"] if summary else None,
+        "architecture": summary["architecture"] if summary else None,
+        "entry": summary["entry"] if summary else None,
+        "program_bytes": summary["program_bytes"] if summary else None,
+        "load_regions": summary["load_regions"] if summary else [],
+        # 文件头中没有生成时间时（如ELF）使用文件修改时间
+        "build_time": (info.get("build_time") if info else None) or st.st_mtime,
+        "image_error": metadata["image_error"],
+    }
+
+
+class ImageLibrary:
+    """
+    镜像库索引
+    """
+
+    def __init__(self, directory, index_path, full_scan_interval=30.0):
+        """
+        :param directory: 镜像目录
+        :param index_path: 索引文件路径
+        :param full_scan_interval: 即使目录未变化也重新检查各文件的间隔（秒），用于发现原地修改的文件
+        """
+        self.directory = directory
+        self.index_path = index_path
+        self._full_scan_interval = full_scan_interval
+        self._lock = threading.Lock()
+        self._entries = {}  # 文件名 -> 索引条目
+        self._dir_mtime_ns = None
+        self._last_scan = 0.0
+        self._loaded = False
+
+    def _load(self):
+        """从索引文件加载（需在持有_lock时调用）"""
+        self._loaded = True
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and data.get("directory") == os.path.abspath(self.directory):
+            self._entries = data.get("entries", {})
+
+    def _save(self):
+        """写入索引文件（需在持有_lock时调用）"""
+        content = json.dumps({
+            "version": INDEX_VERSION,
+            "directory": os.path.abspath(self.directory),
+            "entries": self._entries
+        }, ensure_ascii=False)
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+    def refresh(self, force=False) -> bool:
+        """
+        增量刷新索引
+        :param force: 忽略扫描间隔立即检查
+        :return: 索引是否有变化
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                force = True
+
+            try:
+                dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+            except OSError:
+                changed = bool(self._entries)
+                self._entries = {}
+                return changed
+
+            now = time.monotonic()
+            elapsed = now - self._last_scan
+            if not force and dir_mtime_ns == self._dir_mtime_ns and elapsed < self._full_scan_interval:
+                return False
+            self._dir_mtime_ns = dir_mtime_ns
+            self._last_scan = now
+
+            changed = False
+            seen = set()
+            for name in os.listdir(self.directory):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if not os.path.isfile(path):
+                    continue
+                seen.add(name)
+                entry = self._entries.get(name)
+                if entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                    continue
+                try:
+                    self._entries[name] = _build_entry(path, st)
+                except OSError:
+                    self._entries.pop(name, None)
+                    continue
+                changed = True
+
+            for name in set(self._entries) - seen:
+                del self._entries[name]
+                changed = True
+
+            if changed:
+                self._save()
+            return changed
+
+    def get(self, name):
+        """按文件名获取索引条目（副本），不存在时返回None"""
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(name)
+            return dict(entry) if entry is not None else None
+
+    def query(self, search="", ext=None, architecture=None, sort="name", descending=False,
+              offset=0, limit=None, stats=None):
+        """
+        过滤、排序并分页
+        :param search: 文件名包含的文字（不区分大小写）
+        :param ext: 扩展名（如 .out）
+        :param architecture: 目标架构（C28x、ARM等）
+        :param sort: 排序字段，见SORT_KEYS
+        :param stats: SHA-256 -> 烧录统计字典，合并到结果条目中
+        :return: (符合条件的总数, 当前页条目列表)
+        """
+        self.refresh()
+        search = (search or "").lower()
+        with self._lock:
+            items = [dict(entry) for entry in self._entries.values()
+                     if (not search or search in entry["name"].lower())
+                     and (not ext or entry["ext"] == ext.lower())
+                     and (not architecture or entry["architecture"] == architecture)]
+        if stats:
+            for item in items:
+                item.update(stats.get(item["sha256"], {}))
+        items.sort(key=SORT_KEYS.get(sort, SORT_KEYS["name"]), reverse=descending)
+        total = len(items)
+        end = None if limit is None else offset + limit
+        return total, items[offset:end]
@@ -0,0 +1,130 @@
+# 镜像快照：烧录任务开始排队时把镜像复制为以SHA-256命名的只读文件，dslite只读取快照，
+# 运行中切换或重新上传镜像不影响已排队和正在烧录的通道，所有通道共用同一份快照
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+
+# 文件读取块大小
+CHUNK_SIZE = 1024 * 1024
+
+# 内存文件系统（tmpfs）目录，存在时优先使用
+TMPFS_DIR = "/dev/shm"
+
+
+def default_directory(fallback: str) -> str:
+    """
+    快照目录：有可写的tmpfs时放在内存中，否则使用fallback目录
+    :param fallback: 备用目录（如image/snapshots）
+    """
+    if os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK):
+        return os.path.join(TMPFS_DIR, "uniflash-snapshots")
+    return fallback
+
+
+class ImageSnapshot:
+    """
+    一份镜像快照
+    """
+    __slots__ = ("path", "source", "sha256", "size")
+
+    def __init__(self, path, source, sha256, size):
+        self.path = path        # 快照文件路径（只读）
+        self.source = source    # 原镜像路径
+        self.sha256 = sha256
+        self.size = size
+
+
+class SnapshotStore:
+    """
+    内容寻址的镜像快照存储
+    """
+
+    def __init__(self, directory, keep_unused=4):
+        """
+        :param directory: 快照目录
+        :param keep_unused: 清理时保留的最近未使用快照数
+        """
+        self.directory = directory
+        self._keep_unused = keep_unused
+        self._lock = threading.Lock()
+        self._sources = {}  # (原镜像绝对路径, 大小, mtime_ns) -> ImageSnapshot
+
+    def pin(self, path: str) -> ImageSnapshot:
+        """
+        获取镜像当前内容的快照，原文件未变化且快照仍在时不重新读取
+        :param path: 原镜像路径
+        :raises OSError: 原镜像不存在或无法写入快照
+        """
+        abs_path = os.path.abspath(path)
+        st = os.stat(abs_path)
+        key = (abs_path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            snapshot = self._sources.get(key)
+        if snapshot is not None and os.path.exists(snapshot.path):
+            return snapshot
+
+        snapshot = self._copy(abs_path)
+        with self._lock:
+            for stale_key in [k for k in self._sources if k[0] == abs_path]:
+                del self._sources[stale_key]
+            self._sources[key] = snapshot
+        return snapshot
+
+    def _copy(self, abs_path):
+        """边复制边计算SHA-256，复制完成后按哈希命名；相同内容的快照已存在时直接复用"""
+        os.makedirs(self.directory, exist_ok=True)
+        ext = os.path.splitext(abs_path)[1].lower()
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as dst, open(abs_path, 'rb') as src:
+                while True:
+                    data = src.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    sha256.update(data)
+                    dst.write(data)
+                    size += len(data)
+            digest = sha256.hexdigest()
+            path = os.path.join(self.directory, digest + ext)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.chmod(tmp_path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return ImageSnapshot(path, abs_path, digest, size)
+
+    def cleanup(self, in_use):
+        """
+        删除未被使用的旧快照（保留最近的keep_unused个）
+        :param in_use: 正在使用（排队或烧录中）的快照路径集合
+        :return: 删除的文件数
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        in_use = {os.path.abspath(path) for path in in_use}
+        with self._lock:
+            in_use |= {os.path.abspath(snapshot.path) for snapshot in self._sources.values()}
+        unused = []
+        for name in os.listdir(self.directory):
+            path = os.path.abspath(os.path.join(self.directory, name))
+            if path not in in_use and not name.endswith(".tmp"):
+                unused.append((os.path.getmtime(path), path))
+        unused.sort(reverse=True)
+
+        removed = 0
+        for _, path in unused[self._keep_unused:]:
+            try:
+                os.chmod(path, stat.S_IWRITE | stat.S_IREAD)  # Windows下只读文件需先去掉只读属性
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
@@ -0,0 +1,126 @@
+# 镜像文件存储：流式接收上传（边写临时文件边计算CRC32/SHA-256，完成后原子重命名），
+# 按内容去重，以及清理内容重复的副本和中断上传留下的临时文件
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+
+from image_cache import CHUNK_SIZE
+
+# 上传临时文件后缀
+UPLOAD_SUFFIX = ".uploading"
+
+
+class ReceivedImage:
+    """
+    已接收（尚在临时文件中）的上传镜像
+    """
+    __slots__ = ("tmp_path", "size", "crc32", "sha256")
+
+    def __init__(self, tmp_path, size, crc32, sha256):
+        self.tmp_path = tmp_path
+        self.size = size
+        self.crc32 = crc32
+        self.sha256 = sha256
+
+    def discard(self):
+        """删除临时文件"""
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def receive_stream(stream, directory: str) -> ReceivedImage:
+    """
+    分块读取上传内容写入临时文件，同时计算CRC32和SHA-256
+    :param stream: 可read(n)的输入流（request.stream或上传文件的stream）
+    :param directory: 镜像目录（临时文件与目标文件在同一目录，保证可以原子重命名）
+    :raises OSError: 写入失败（临时文件已删除）
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=UPLOAD_SUFFIX)
+    crc = 0
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                sha256.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return ReceivedImage(tmp_path, size, f"{crc & 0xFFFFFFFF:08X}", sha256.hexdigest())
+
+
+def _image_files(directory, ext=None):
+    """目录中的镜像文件 [(文件名, os.stat结果)]"""
+    files = []
+    for name in os.listdir(directory):
+        if name.endswith(UPLOAD_SUFFIX) or (ext and not name.lower().endswith(ext)):
+            continue
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            files.append((name, os.stat(path)))
+    return files
+
+
+def find_duplicate(directory: str, received: ReceivedImage, ext: str, get_sha256):
+    """
+    查找内容与上传镜像相同的已有文件（先按大小筛选，只对大小相同的文件取哈希）
+    :param ext: 扩展名，只与同类型文件比较
+    :param get_sha256: 获取文件SHA-256的函数（使用元数据缓存，避免重复读取）
+    :return: 文件名，没有时返回None
+    """
+    for name, st in sorted(_image_files(directory, ext)):
+        if st.st_size == received.size and get_sha256(os.path.join(directory, name)) == received.sha256:
+            return name
+    return None
+
+
+def find_duplicate_groups(directory: str, get_sha256) -> list:
+    """
+    按内容分组目录中重复的镜像文件
+    :return: [[文件名, ...], ...]，每组至少两个文件
+    """
+    by_size = {}
+    for name, st in _image_files(directory):
+        ext = os.path.splitext(name)[1].lower()
+        by_size.setdefault((ext, st.st_size), []).append(name)
+
+    groups = []
+    for (ext, _), names in by_size.items():
+        if len(names) < 2:
+            continue
+        by_hash = {}
+        for name in names:
+            by_hash.setdefault(get_sha256(os.path.join(directory, name)), []).append(name)
+        groups.extend(sorted(group) for sha256, group in by_hash.items() if sha256 and len(group) > 1)
+    return groups
+
+
+def remove_stale_uploads(directory: str, max_age=3600) -> list:
+    """
+    删除中断上传留下的临时文件
+    :param max_age: 只删除超过该时间（秒）未修改的临时文件，避免影响进行中的上传
+    :return: 删除的文件名列表
+    """
+    removed = []
+    if not os.path.isdir(directory):
+        return removed
+    now = time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(UPLOAD_SUFFIX) and now - os.path.getmtime(path) > max_age:
+            try:
+                os.remove(path)
+                removed.append(name)
+            except OSError:
+                pass
+    return removed
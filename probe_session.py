@@ -0,0 +1,206 @@
+# 烧录器常驻调试会话
+#
+# 每个烧录器保持一个长期运行的调试服务进程（连接与初始化只做一次），
+# 通过标准输入/输出上的行协议下发 program / verify / erase / reset 等命令：
+#
+#     启动完成:  服务端输出一行  @@READY
+#     请求:      客户端写入一行JSON  {"id": 1, "cmd": "program", "image": "...", "options": {...}}
+#     过程输出:  服务端任意输出普通文本行（与dslite输出格式一致，可用于解析进度）
+#     结果:      服务端输出一行  @@RESULT {"id": 1, "ok": true, "message": "..."}
+#
+# 目前只有 sim/fake_debug_server.py 实现了该协议，尚未提供TI调试服务（DebugServer/DSS）的适配程序，
+# 因此生产环境中此功能不可用：app.py中DEBUG_SERVER_COMMAND默认为空，未配置时无法开启常驻会话。
+import json
+import queue
+import subprocess
+import threading
+import time
+
+import process_utils
+
+READY_MARKER = "@@READY"
+RESULT_MARKER = "@@RESULT"
+
+
+class SessionError(Exception):
+    """会话启动失败、异常退出或命令超时"""
+
+
+class ProbeSession:
+    """
+    单个烧录器的常驻调试会话
+    """
+
+    def __init__(self, key, argv, startup_timeout=180):
+        """
+        :param key: 会话标识（通常为通道的ccxml文件路径）
+        :param argv: 调试服务进程的启动参数列表
+        :param startup_timeout: 等待服务端就绪的超时时间（秒）
+        """
+        self.key = key
+        self.argv = list(argv)
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self._lines = queue.Queue()
+        self._next_id = 0
+        self._command_lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, on_line=None, on_spawn=None):
+        """
+        启动调试服务进程并等待就绪
+        :param on_line: 启动过程中每行输出的回调（可选）
+        :param on_spawn: 进程创建后、等待就绪前调用 on_spawn(process)，用于登记进程以便启动期间也能终止
+        :raises SessionError: 启动失败或超时
+        """
+        try:
+            self.process = subprocess.Popen(
+                self.argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding='utf-8',
+                errors='ignore',
+                bufsize=1,
+                **process_utils.process_group_kwargs()
+            )
+        except OSError as e:
+            raise SessionError(f"启动调试会话失败: {str(e)}")
+
+        threading.Thread(target=self._read_output, daemon=True).start()
+        if on_spawn:
+            on_spawn(self.process)
+
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            try:
+                line = self._next_line(deadline)
+            except SessionError:
+                self.close()
+                raise
+            if line.strip() == READY_MARKER:
+                return
+            if on_line:
+                on_line(line)
+
+    def run(self, cmd, image=None, options=None, timeout=300, on_line=None):
+        """
+        在会话中执行一条命令
+        :param cmd: 命令名称（program / verify / erase / reset / ping）
+        :param image: 镜像文件路径
+        :param options: 附加参数
+        :param timeout: 超时时间（秒），超时后结束会话进程
+        :param on_line: 过程输出的回调
+        :return: (是否成功, 消息)
+        :raises SessionError: 会话已退出或命令超时
+        """
+        with self._command_lock:
+            if not self.alive:
+                raise SessionError("调试会话未运行")
+
+            self._next_id += 1
+            request = {"id": self._next_id, "cmd": cmd, "image": image, "options": options or {}}
+            try:
+                self.process.stdin.write(json.dumps(request) + "\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                self.close()
+                raise SessionError(f"写入调试会话失败: {str(e)}")
+
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    line = self._next_line(deadline)
+                except SessionError:
+                    self.close()
+                    raise
+                if line.startswith(RESULT_MARKER):
+                    try:
+                        result = json.loads(line[len(RESULT_MARKER):])
+                    except ValueError:
+                        continue
+                    if result.get("id") == request["id"]:
+                        return bool(result.get("ok")), result.get("message", "")
+                elif on_line:
+                    on_line(line)
+
+    def close(self):
+        """结束会话进程树"""
+        process = self.process
+        if process is None:
+            return
+        try:
+            if process.poll() is None and process.stdin:
+                process.stdin.close()
+        except OSError:
+            pass
+        process_utils.kill_process_tree(process)
+
+    def _read_output(self):
+        process = self.process
+        for line in process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)  # 进程已退出
+
+    def _next_line(self, deadline) -> str:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise SessionError("调试会话响应超时")
+        try:
+            line = self._lines.get(timeout=remaining)
+        except queue.Empty:
+            raise SessionError("调试会话响应超时")
+        if line is None:
+            raise SessionError(f"调试会话已退出 (返回码: {self.process.poll()})")
+        return line
+
+
+class SessionManager:
+    """
+    按通道管理常驻会话：ccxml变化（更换烧录器）或会话退出后自动重建
+    """
+
+    def __init__(self, argv_factory):
+        """
+        :param argv_factory: 根据ccxml文件路径生成调试服务启动参数的函数
+        """
+        self._argv_factory = argv_factory
+        self._sessions = {}  # channel -> ProbeSession
+        self._lock = threading.Lock()
+
+    def get(self, channel, ccxml_file, on_line=None, on_spawn=None) -> ProbeSession:
+        """
+        获取通道的会话，不存在、已退出或ccxml变化时重新启动
+        :param on_spawn: 新启动会话时的进程创建回调，见ProbeSession.start
+        :raises SessionError: 启动失败
+        """
+        with self._lock:
+            session = self._sessions.get(channel)
+            if session is not None and session.alive and session.key == ccxml_file:
+                return session
+            if session is not None:
+                session.close()
+            session = ProbeSession(ccxml_file, self._argv_factory(ccxml_file))
+            self._sessions[channel] = session
+
+        session.start(on_line=on_line, on_spawn=on_spawn)
+        return session
+
+    def close(self, channel):
+        """关闭通道的会话"""
+        with self._lock:
+            session = self._sessions.pop(channel, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        """关闭所有会话"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
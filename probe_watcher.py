@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+# Linux下USB设备目录，内容变化即表示有设备插拔
+SYSFS_USB_DEVICES = "/sys/bus/usb/devices"
+
+
+def assign_channels(serial_map: dict, serials: list, max_channels: int) -> dict:
+    """
+    根据扫描到的序列号增量更新 序列号->通道 映射，保持已分配通道不变
+    - 已分配的序列号保持原通道（拔出后重新插入也回到原通道）
+    - 新序列号优先分配从未使用过的最小空闲通道，没有时复用已拔出烧录器的通道
+    :param serial_map: 当前映射 {序列号: 通道}（包含已拔出的烧录器）
+    :param serials: 本次扫描到的序列号列表
+    :param max_channels: 最大通道数
+    :return: 新映射
+    """
+    present = set(serials)
+    new_map = dict(serial_map)
+
+    for serial in serials:
+        if serial in new_map:
+            continue
+        used = set(new_map.values())
+        free = [ch for ch in range(1, max_channels + 1) if ch not in used]
+        if free:
+            channel = free[0]
+        else:
+            # 复用已拔出烧录器的通道
+            online = {ch for s, ch in new_map.items() if s in present}
+            offline = sorted(ch for s, ch in new_map.items() if s not in present and ch not in online)
+            if not offline:
+                continue  # 通道已满
+            channel = offline[0]
+            for stale in [s for s, ch in new_map.items() if ch == channel]:
+                del new_map[stale]
+        new_map[serial] = channel
+
+    return new_map
+
+
+def online_channels(serial_map: dict, serials) -> dict:
+    """
+    在线烧录器的 通道->序列号 视图
+    :param serial_map: {序列号: 通道}
+    :param serials: 当前在线的序列号
+    """
+    present = set(serials)
+    return {ch: serial for serial, ch in serial_map.items() if serial in present}
+
+
+class ProbeWatcher:
+    """
+    烧录器热插拔监视：后台周期性扫描，序列号集合变化时回调。
+    Linux下同时监视sysfs USB设备目录，有插拔时立即扫描，无变化时按间隔兜底扫描。
+    """
+
+    def __init__(self, scan_func, on_change, interval=5.0, poll_interval=1.0, should_scan=None):
+        """
+        :param scan_func: 扫描函数，返回序列号列表，失败时返回None
+        :param on_change: 序列号集合变化时的回调 on_change(serials)
+        :param interval: 兜底扫描间隔（秒）
+        :param poll_interval: sysfs检查间隔（秒）
+        :param should_scan: 判断是否允许兜底扫描的函数（如烧录进行中时跳过），可选
+        """
+        self._scan_func = scan_func
+        self._on_change = on_change
+        self.interval = interval
+        self._poll_interval = poll_interval
+        self._should_scan = should_scan
+        self._last_serials = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="probe-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def notify_scanned(self, serials):
+        """手动扫描后同步结果，避免重复回调"""
+        self._last_serials = sorted(serials)
+
+    def _usb_fingerprint(self):
+        try:
+            return frozenset(os.listdir(SYSFS_USB_DEVICES))
+        except OSError:
+            return None
+
+    def _loop(self):
+        fingerprint = self._usb_fingerprint()
+        last_scan = 0.0
+        while not self._stop_event.is_set():
+            current = self._usb_fingerprint()
+            usb_changed = current != fingerprint
+            fingerprint = current
+
+            due = time.monotonic() - last_scan >= self.interval
+            if due and self._should_scan is not None and not self._should_scan():
+                due = False
+
+            if usb_changed or due:
+                last_scan = time.monotonic()
+                serials = self._scan_func()
+                if serials is not None and sorted(serials) != self._last_serials:
+                    self._last_serials = sorted(serials)
+                    self._on_change(serials)
+
+            self._stop_event.wait(self._poll_interval)
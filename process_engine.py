@@ -0,0 +1,236 @@
+# 子进程引擎：所有dslite/xdsdfu进程在同一个asyncio事件循环线程中启动、读取输出和超时控制。
+#
+# 调用线程（烧录调度器的工作线程）只在队列上等待输出行，不再为每个进程创建读取线程和超时定时器线程；
+# 超时通过取消读取任务并结束进程树实现。等待重试等延时任务也由同一个事件循环计时。
+# 事件循环线程中不执行任何应用回调（输出行交给调用线程，延时任务交给线程池），
+# 因此不会因等待status_lock等应用锁而拖慢其他进程的输出读取。
+# 注意：每个烧录任务的流程控制仍在调度器的工作线程中执行（每个运行中的通道一个线程）。
+import asyncio
+import codecs
+import io
+import logging
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+
+import process_utils
+
+# 每次从管道读取的字节数
+READ_SIZE = 64 * 1024
+
+# 输出结束标记
+_EOF = object()
+
+
+class EngineProcess:
+    """
+    引擎中运行的子进程句柄，可在任意线程中使用（提供kill_process_tree所需的pid/poll/kill）
+    """
+    __slots__ = ("pid", "returncode", "_loop", "_process")
+
+    def __init__(self, loop, process):
+        self._loop = loop
+        self._process = process
+        self.pid = process.pid
+        self.returncode = None  # 进程结束并回收后由事件循环设置
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        self._loop.call_soon_threadsafe(self._kill)
+
+    def _kill(self):
+        if self._process.returncode is not None:
+            return
+        try:
+            if os.name == "nt":
+                self._process.kill()
+            else:
+                # 不经过Popen.kill：它会先回收进程，使事件循环中的等待拿不到返回码
+                os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class EngineTimer:
+    """
+    事件循环中的延时调用，可在任意线程中cancel()
+    """
+    __slots__ = ("_loop", "_handle", "_cancelled")
+
+    def __init__(self, loop, delay, callback, args):
+        self._loop = loop
+        self._handle = None
+        self._cancelled = False
+        loop.call_soon_threadsafe(self._schedule, delay, callback, args)
+
+    def _schedule(self, delay, callback, args):
+        if not self._cancelled:
+            self._handle = self._loop.call_later(delay, self._fire, callback, args)
+
+    def _fire(self, callback, args):
+        # 回调可能需要等待应用锁，交给线程池执行，事件循环只负责计时
+        if not self._cancelled:
+            self._loop.run_in_executor(None, self._call, callback, args)
+
+    @staticmethod
+    def _call(callback, args):
+        try:
+            callback(*args)
+        except Exception:
+            logging.getLogger(__name__).exception("延时任务执行异常")
+
+    def cancel(self):
+        self._cancelled = True
+        self._loop.call_soon_threadsafe(self._cancel)
+
+    def _cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+
+
+def _use_pidfd_watcher(loop):
+    """
+    Linux下Python 3.12之前默认每个子进程用一个线程等待退出，内核支持时改用pidfd在事件循环中等待
+    （3.12起默认即为pidfd；Windows使用Proactor事件循环，无需处理）
+    """
+    if os.name == "nt" or sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.get_event_loop_policy().set_child_watcher(watcher)
+
+
+class ProcessEngine:
+    """
+    基于单个asyncio事件循环的子进程引擎（事件循环线程在首次使用时启动）
+    """
+
+    def __init__(self, name="process-engine"):
+        """
+        :param name: 事件循环线程名称
+        """
+        self._name = name
+        self._loop = None
+        self._start_lock = threading.Lock()
+        self._active = 0  # 运行中的进程数（仅在事件循环线程中修改）
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(target=self._loop_main, args=(loop, ready), name=self._name, daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _loop_main(loop, ready):
+        asyncio.set_event_loop(loop)
+        _use_pidfd_watcher(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def active_count(self) -> int:
+        """运行中的子进程数"""
+        return self._active
+
+    def call_later(self, delay, callback, *args) -> EngineTimer:
+        """
+        延时调用callback：事件循环计时，到时在线程池线程中执行（callback可以获取应用锁）
+        :param delay: 延时（秒）
+        :return: 可在任意线程中取消的EngineTimer
+        """
+        return EngineTimer(self._ensure_loop(), delay, callback, args)
+
+    def run(self, argv, timeout=None, on_start=None, on_line=None) -> int:
+        """
+        运行子进程直到结束，输出（stdout与stderr合并）按行交给调用线程处理
+        :param argv: 命令参数列表（不经过shell）
+        :param timeout: 超时时间（秒），超时后结束进程树并抛出TimeoutExpired
+        :param on_start: 进程启动后在调用线程中调用 on_start(EngineProcess)，可用于登记进程以便终止
+        :param on_line: 在调用线程中对每行输出调用 on_line(line)，行尾保留换行符
+        :return: 返回码（被终止时非0）
+        :raises subprocess.TimeoutExpired: 运行超时
+        :raises OSError: 无法启动进程
+        """
+        argv = list(argv)
+        lines = queue.SimpleQueue()
+        future = asyncio.run_coroutine_threadsafe(self._run(argv, timeout, lines), self._ensure_loop())
+        process = None
+        try:
+            while True:
+                item = lines.get()
+                if item is _EOF:
+                    break
+                if isinstance(item, EngineProcess):
+                    process = item
+                    if on_start is not None:
+                        on_start(process)
+                elif on_line is not None:
+                    on_line(item)
+        except BaseException:
+            # 调用线程处理输出出错时结束进程，避免留下无人读取的进程
+            process_utils.kill_process_tree(process)
+            raise
+
+        returncode, timed_out = future.result()
+        if timed_out:
+            raise subprocess.TimeoutExpired(argv, timeout)
+        return returncode
+
+    async def _run(self, argv, timeout, lines):
+        """事件循环中启动进程、读取输出并等待结束，返回 (返回码, 是否超时)"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                **process_utils.process_group_kwargs()
+            )
+            handle = EngineProcess(asyncio.get_running_loop(), process)
+            self._active += 1
+            lines.put(handle)
+            timed_out = False
+            try:
+                await asyncio.wait_for(self._pump(process, lines), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+            finally:
+                if process.returncode is None:
+                    # Windows下taskkill需要等待，放到线程池中执行，不阻塞事件循环
+                    await asyncio.get_running_loop().run_in_executor(None, process_utils.kill_process_tree, handle)
+                    await process.wait()
+                handle.returncode = process.returncode
+                self._active -= 1
+            return process.returncode, timed_out
+        finally:
+            lines.put(_EOF)
+
+    @staticmethod
+    async def _pump(process, lines):
+        """按块读取输出并切分为行（CRLF和单独的CR都按换行处理，与文本模式的Popen一致）"""
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="ignore"), translate=True)
+        pending = ""
+        while True:
+            data = await process.stdout.read(READ_SIZE)
+            pending += decoder.decode(data, final=not data)
+            *complete, pending = pending.split("\n")
+            for line in complete:
+                lines.put(line + "\n")
+            if not data:
+                break
+        if pending:
+            lines.put(pending)
+        await process.wait()
@@ -0,0 +1,42 @@
+import os
+import signal
+import subprocess
+
+
+def process_group_kwargs() -> dict:
+    """
+    启动子进程时使用的参数：让子进程成为独立进程组的组长，便于之后整体结束进程树
+    :return: 传给subprocess.Popen的关键字参数
+    """
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_tree(process):
+    """
+    立即结束进程及其全部子进程（dslite会拉起DebugServer等子进程，只结束父进程无法释放烧录器）
+    :param process: 由process_group_kwargs()参数启动的进程（Popen或process_engine.EngineProcess）
+    """
+    if process is None or process.poll() is not None:
+        return
+
+    try:
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=10
+            )
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+
+    # 兜底：进程组方式失败时至少结束父进程
+    if process.poll() is None:
+        try:
+            process.kill()
+        except OSError:
+            pass
@@ -0,0 +1,215 @@
+# 生产记录存储：每次烧录一条记录，写入本地SQLite数据库（WAL模式）
+#
+# 烧录线程只把记录放入内存队列，由后台写入线程批量提交，不会因磁盘IO阻塞；
+# 查询与导出使用独立的只读连接，按自增id分页（keyset），大量记录时也只占用一页的内存。
+import json
+import queue
+import sqlite3
+import threading
+
+_COLUMNS = (
+    "timestamp", "lot_id", "channel", "serial", "chip_type", "image", "image_sha256",
+    "result", "failure_class", "return_code", "duration", "phase_durations", "message"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flash_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp REAL NOT NULL,
+    lot_id TEXT,
+    channel INTEGER,
+    serial TEXT,
+    chip_type TEXT,
+    image TEXT,
+    image_sha256 TEXT,
+    result TEXT,
+    failure_class TEXT,
+    return_code INTEGER,
+    duration REAL,
+    phase_durations TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_flash_records_timestamp ON flash_records (timestamp);
+CREATE INDEX IF NOT EXISTS idx_flash_records_serial ON flash_records (serial);
+CREATE INDEX IF NOT EXISTS idx_flash_records_lot ON flash_records (lot_id);
+CREATE INDEX IF NOT EXISTS idx_flash_records_image ON flash_records (image_sha256);
+"""
+
+# 查询条件字段 -> SQL条件
+_FILTERS = {
+    "lot_id": "lot_id = ?",
+    "serial": "serial = ?",
+    "channel": "channel = ?",
+    "result": "result = ?",
+    "failure_class": "failure_class = ?",
+    "since": "timestamp >= ?",
+    "until": "timestamp < ?",
+}
+
+# 导出时每次从数据库读取的行数
+EXPORT_PAGE_SIZE = 1000
+
+EXPORT_COLUMNS = ("id",) + _COLUMNS
+
+
+class RecordStore:
+    """
+    生产记录存储
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=0.5):
+        """
+        :param path: 数据库文件路径
+        :param batch_size: 单次提交的最大记录数
+        :param flush_interval: 队列中有记录时的最长等待提交时间（秒）
+        """
+        self.path = path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.last_error = None  # 最近一次写入失败的原因
+
+        # 建表在初始化时完成，保证查询接口可用
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, record: dict):
+        """
+        添加一条记录（不阻塞，由后台线程写入）
+        :param record: 字段见_COLUMNS，phase_durations可为字典
+        """
+        self._ensure_writer()
+        self._queue.put(record)
+
+    def flush(self, timeout=None):
+        """等待已添加的记录全部写入"""
+        done = threading.Event()
+        self._ensure_writer()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name="record-writer", daemon=True)
+                self._thread.start()
+
+    def _writer_loop(self):
+        conn = self._connect()
+        sql = f"INSERT INTO flash_records ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        while True:
+            item = self._queue.get()
+            batch, waiters = [], []
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(self._to_row(item))
+                if len(batch) >= self._batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=self._flush_interval if batch else 0)
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(sql, batch)
+                except sqlite3.Error as e:
+                    # 写入失败时丢弃本批，避免阻塞后续记录
+                    self.last_error = f"写入{len(batch)}条记录失败: {str(e)}"
+            for waiter in waiters:
+                waiter.set()
+
+    @staticmethod
+    def _to_row(record):
+        row = []
+        for column in _COLUMNS:
+            value = record.get(column)
+            if column == "phase_durations" and value is not None and not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False)
+            row.append(value)
+        return row
+
+    @staticmethod
+    def _where(filters):
+        clauses, params = [], []
+        for key, clause in _FILTERS.items():
+            value = (filters or {}).get(key)
+            if value is not None and value != "":
+                clauses.append(clause)
+                params.append(value)
+        return clauses, params
+
+    def query(self, after_id=0, limit=100, filters=None) -> list:
+        """
+        按id升序分页查询
+        :param after_id: 只返回id大于该值的记录（上一页最后一条的id）
+        :param limit: 每页记录数
+        :param filters: 查询条件，键见_FILTERS
+        :return: 记录字典列表
+        """
+        clauses, params = self._where(filters)
+        clauses.insert(0, "id > ?")
+        params.insert(0, after_id)
+        sql = (f"SELECT {', '.join(EXPORT_COLUMNS)} FROM flash_records "
+               f"WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?")
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params + [limit]).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(EXPORT_COLUMNS, row)) for row in rows]
+
+    def iter_records(self, filters=None, page_size=EXPORT_PAGE_SIZE):
+        """按页流式读取所有符合条件的记录"""
+        after_id = 0
+        while True:
+            page = self.query(after_id, page_size, filters)
+            if not page:
+                return
+            yield from page
+            after_id = page[-1]["id"]
+
+    def count(self, filters=None) -> int:
+        clauses, params = self._where(filters)
+        sql = "SELECT COUNT(*) FROM flash_records"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def image_stats(self) -> dict:
+        """
+        按镜像内容统计烧录次数（内容一致跳过的计为成功，不含中间重试和人工终止）
+        :return: SHA-256 -> {"flash_count", "success_count", "fail_count", "last_flashed"}
+        """
+        sql = ("SELECT image_sha256, COUNT(*), SUM(result != 'failure'), SUM(result = 'failure'), MAX(timestamp) "
+               "FROM flash_records WHERE image_sha256 IS NOT NULL AND result IN ('success', 'skipped', 'failure') "
+               "AND COALESCE(failure_class, '') != 'cancelled' "
+               "GROUP BY image_sha256")
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+        return {
+            sha256: {"flash_count": total, "success_count": success, "fail_count": fail, "last_flashed": last}
+            for sha256, total, success, fail, last in rows
+        }
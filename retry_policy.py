@@ -0,0 +1,126 @@
+# 烧录失败自动重试策略：按失败类别（见flash_failures）分别配置重试次数与退避时间
+import random
+
+
+class RetryRule:
+    """
+    单个失败类别的重试规则
+    """
+    __slots__ = ("max_retries", "backoff", "factor", "max_backoff", "factory_reset")
+
+    def __init__(self, max_retries=0, backoff=1.0, factor=2.0, max_backoff=30.0, factory_reset=False):
+        """
+        :param max_retries: 最大重试次数（0表示不重试）
+        :param backoff: 第一次重试前的等待时间（秒）
+        :param factor: 每次重试等待时间的倍数
+        :param max_backoff: 等待时间上限（秒）
+        :param factory_reset: 重试前是否先执行工厂复位（仅MSP系列有效）
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.factor = factor
+        self.max_backoff = max_backoff
+        self.factory_reset = factory_reset
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# 默认规则：连接类故障多为接触不良或USB枚举慢，多试几次；锁定的芯片复位后重试一次；
+# 配置错误、人工终止和无法判断的错误不重试
+DEFAULT_RULES = {
+    "probe_not_found": RetryRule(max_retries=2, backoff=2.0),
+    "target_not_responding": RetryRule(max_retries=3, backoff=1.0),
+    "device_locked": RetryRule(max_retries=1, backoff=0.0, factory_reset=True),
+    "verify_mismatch": RetryRule(max_retries=1, backoff=0.5),
+    "timeout": RetryRule(max_retries=1, backoff=2.0),
+}
+
+def _parse_bool(value) -> bool:
+    """
+    解析布尔参数（JSON布尔值、0/1或表单字符串），bool("false")为True，不能直接转换
+    :raises ValueError: 无法识别的值
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ("true", "1", "on", "yes"):
+            return True
+        if text in ("false", "0", "off", "no"):
+            return False
+    raise ValueError(f"无效的布尔值: {value!r}")
+
+
+# 规则各参数的类型（前端提交的值按此转换）
+_FIELD_TYPES = {"max_retries": int, "backoff": float, "factor": float, "max_backoff": float,
+                "factory_reset": _parse_bool}
+
+# 退避时间随机波动比例，避免多个通道同时重试
+JITTER = 0.1
+
+
+class RetryDecision:
+    """
+    一次重试的安排
+    """
+    __slots__ = ("attempt", "delay", "factory_reset")
+
+    def __init__(self, attempt, delay, factory_reset):
+        self.attempt = attempt              # 第几次重试（从1开始）
+        self.delay = delay                  # 重试前等待时间（秒）
+        self.factory_reset = factory_reset  # 重试前是否执行工厂复位
+
+
+class RetryPolicy:
+    """
+    重试策略
+    """
+
+    def __init__(self, rules=None, enabled=True):
+        """
+        :param rules: 失败类别 -> RetryRule，未指定时使用DEFAULT_RULES
+        :param enabled: 是否启用自动重试
+        """
+        self.rules = dict(DEFAULT_RULES if rules is None else rules)
+        self.enabled = enabled
+
+    def decide(self, failure_class, retries_done, can_factory_reset=True):
+        """
+        判断失败后是否重试
+        :param failure_class: 失败类别
+        :param retries_done: 本次烧录已重试的次数
+        :param can_factory_reset: 当前芯片是否支持工厂复位；规则要求复位但不支持时不重试
+        :return: RetryDecision，不重试时返回None
+        """
+        rule = self.rules.get(failure_class)
+        if not self.enabled or rule is None or retries_done >= rule.max_retries:
+            return None
+        if rule.factory_reset and not can_factory_reset:
+            return None
+        delay = min(rule.max_backoff, rule.backoff * (rule.factor ** retries_done))
+        delay *= 1 + random.uniform(-JITTER, JITTER)
+        return RetryDecision(retries_done + 1, max(0.0, delay), rule.factory_reset)
+
+    def update_rule(self, failure_class, **fields):
+        """
+        修改某个失败类别的规则（不存在时新建）
+        :raises ValueError: 参数无效
+        """
+        rule = self.rules.get(failure_class) or RetryRule()
+        values = rule.to_dict()
+        for name, value in fields.items():
+            if name not in values:
+                raise ValueError(f"未知的重试参数: {name}")
+            values[name] = _FIELD_TYPES[name](value)
+        if values["max_retries"] < 0 or values["backoff"] < 0 or values["factor"] < 1 or values["max_backoff"] < 0:
+            raise ValueError("重试次数和等待时间不能为负数，倍数不能小于1")
+        self.rules[failure_class] = RetryRule(**values)
+
+    def to_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "rules": {failure_class: rule.to_dict() for failure_class, rule in self.rules.items()}
+        }
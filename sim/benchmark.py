@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+烧录吞吐基准测试：用fake_dslite/fake_xdsdfu替代真实工具，按不同通道数驱动start_all_channels
+
+用法: python sim/benchmark.py [--channels 1 2 4 8 16 32 64] [--concurrency N]
+                              [--connect 1.0] [--erase 0.5] [--program 1.0] [--verify 0.5]
+                              [--fail-rate 0] [--lots 1] [--json]
+
+在临时目录中运行（复制母版ccxml和镜像），不影响仓库中的文件。每个通道数输出:
+    units/h        每小时烧录片数（按批次总耗时计算）
+    overhead       调度开销：批次总耗时 - 单片耗时总和 / 实际并发数
+    queue wait     任务从排队到开始运行的平均等待时间
+    status p50/p95 /api/status 的响应延迟（烧录进行中持续轮询）
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SIM_DIR)
+
+
+def sim_tool(name):
+    """替身工具路径（Windows下使用.cmd包装）"""
+    return os.path.join(SIM_DIR, f"{name}.cmd" if os.name == "nt" else f"{name}.py")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(pct / 100 * len(ordered))) - 1)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="烧录吞吐基准测试（模拟dslite）")
+    parser.add_argument("--channels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64], help="测试的通道数")
+    parser.add_argument("--concurrency", type=int, default=0, help="最大并发烧录数，0表示等于通道数")
+    parser.add_argument("--chip", default="F28P55", help="芯片型号")
+    parser.add_argument("--image", default=os.path.join(REPO_DIR, "image", "led_ex1_blinky.out"), help="镜像文件")
+    parser.add_argument("--connect", type=float, default=1.0, help="模拟的调试器配置+连接耗时（秒）")
+    parser.add_argument("--erase", type=float, default=0.5, help="模拟的擦除耗时（秒）")
+    parser.add_argument("--program", type=float, default=1.0, help="模拟的写入耗时（秒）")
+    parser.add_argument("--verify", type=float, default=0.5, help="模拟的校验耗时（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="模拟的随机失败概率")
+    parser.add_argument("--lots", type=int, default=1, help="每个通道数重复的批次数")
+    parser.add_argument("--poll", type=float, default=0.05, help="状态轮询间隔（秒）")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    parser.add_argument("--keep", action="store_true", help="保留临时工作目录")
+    return parser.parse_args()
+
+
+def setup_workdir(args):
+    """创建临时工作目录并切换过去，返回目录路径"""
+    workdir = tempfile.mkdtemp(prefix="uniflash-bench-")
+    for name in os.listdir(REPO_DIR):
+        if name.endswith(".ccxml"):
+            shutil.copy(os.path.join(REPO_DIR, name), workdir)
+    os.makedirs(os.path.join(workdir, "image"))
+    shutil.copy(args.image, os.path.join(workdir, "image"))
+    os.chdir(workdir)
+
+    os.environ.update({
+        "FAKE_DSLITE_CONNECT": str(args.connect),
+        "FAKE_DSLITE_ERASE": str(args.erase),
+        "FAKE_DSLITE_PROGRAM": str(args.program),
+        "FAKE_DSLITE_VERIFY": str(args.verify),
+        "FAKE_DSLITE_FAIL_RATE": str(args.fail_rate),
+        "FAKE_XDSDFU_PROBES": str(max(args.channels)),
+        "FAKE_XDSDFU_LATENCY": "0",
+    })
+    return workdir
+
+
+def run_lot(app, client, num_channels, poll):
+    """运行一个批次，返回 (总耗时, 状态接口延迟列表, 批次时间线)"""
+    latencies = []
+    started = time.perf_counter()
+    ok, message = app.start_all_channels(num_channels, False)
+    if not ok:
+        raise RuntimeError(message)
+
+    while True:
+        t = time.perf_counter()
+        status = client.get("/api/status").get_json()
+        latencies.append(time.perf_counter() - t)
+        if not status["is_running"]:
+            break
+        time.sleep(poll)
+    elapsed = time.perf_counter() - started
+
+    # 通道状态先于时间线更新，等待所有通道的记录写入
+    deadline = time.time() + 10
+    while True:
+        lot = app.timeline_store.get_lot(app.timeline_store.latest_lot_id())
+        if (lot and len(lot["runs"]) >= num_channels) or time.time() > deadline:
+            return elapsed, latencies, lot
+        time.sleep(0.01)
+
+
+def main():
+    args = parse_args()
+    workdir = setup_workdir(args)
+    sys.path.insert(0, REPO_DIR)
+    import app  # noqa: E402  在工作目录中导入，生成文件写入临时目录
+
+    app.DSLITE_PATH = sim_tool("fake_dslite")
+    app.XDSDFU_PATH = sim_tool("fake_xdsdfu")
+    app.TARGET_DEVICE_TYPE = args.chip
+    app.MASTER_CCXML_PATH = app.get_ccxml_file(args.chip)
+    app.OUT_FILE = os.path.join("image", os.path.basename(args.image))
+    app.MAX_FLASH_COUNT = 10 ** 9
+    client = app.app.test_client()
+
+    scan_started = time.perf_counter()
+    ok, serials, message = app.scan_devices()
+    scan_time = time.perf_counter() - scan_started
+    if not ok or len(serials) < max(args.channels):
+        print(f"模拟扫描失败: {message}", file=sys.stderr)
+        return 1
+
+    results = []
+    try:
+        for num_channels in args.channels:
+            concurrency = args.concurrency or num_channels
+            app.NUM_CHANNELS = num_channels
+            app.MAX_CONCURRENT_FLASHES = concurrency
+            app.flash_scheduler_pool.set_max_workers(concurrency)
+
+            for _ in range(args.lots):
+                app.reset_counters()
+                elapsed, latencies, lot = run_lot(app, client, num_channels, args.poll)
+                runs = lot["runs"] if lot else []
+                durations = [run["end"] - run["start"] for run in runs]
+                waits = [run["start"] - run["queued"] for run in runs if run.get("queued")]
+                effective = min(num_channels, concurrency)
+                overhead = elapsed - sum(durations) / effective if durations else 0.0
+                with app.status_lock:
+                    success, fail = app.channel_states.total_success, app.channel_states.total_fail
+                results.append({
+                    "channels": num_channels,
+                    "concurrency": concurrency,
+                    "elapsed_s": round(elapsed, 3),
+                    "units_per_hour": round(num_channels / elapsed * 3600, 1),
+                    "success": success,
+                    "fail": fail,
+                    "mean_unit_s": round(statistics.mean(durations), 3) if durations else None,
+                    "overhead_s": round(overhead, 3),
+                    "overhead_pct": round(overhead / elapsed * 100, 1),
+                    "mean_queue_wait_s": round(statistics.mean(waits), 3) if waits else None,
+                    "status_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                    "status_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                    "status_max_ms": round(max(latencies) * 1000, 2),
+                })
+    finally:
+        app.stop_all_channels()
+        app.record_store.flush(5)
+        os.chdir(REPO_DIR)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"scan_s": round(scan_time, 3), "results": results}, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"模拟扫描 {max(args.channels)} 个烧录器耗时: {scan_time:.3f}s")
+    header = (f"{'通道':>4} {'并发':>4} {'耗时s':>8} {'units/h':>9} {'成功':>4} {'失败':>4} "
+              f"{'单片s':>7} {'开销s':>7} {'开销%':>6} {'排队s':>7} {'p50ms':>7} {'p95ms':>7} {'maxms':>7}")
+    print(header)
+    for r in results:
+        print(f"{r['channels']:>6} {r['concurrency']:>6} {r['elapsed_s']:>8.2f} {r['units_per_hour']:>9.1f} "
+              f"{r['success']:>6} {r['fail']:>6} {r['mean_unit_s'] or 0:>7.2f} {r['overhead_s']:>7.2f} "
+              f"{r['overhead_pct']:>6.1f} {r['mean_queue_wait_s'] or 0:>7.2f} {r['status_p50_ms']:>7.2f} "
+              f"{r['status_p95_ms']:>7.2f} {r['status_max_ms']:>7.2f}")
+    if args.keep:
+        print(f"工作目录: {workdir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
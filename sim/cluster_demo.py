@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+多主机烧录本机验证：在本机不同端口启动若干代理节点（使用fake_dslite/fake_xdsdfu），
+由进程内的协调器分发镜像、启动烧录并合并状态，检查结果是否符合预期
+
+用法: python sim/cluster_demo.py [--agents 3] [--probes 4] [--chip MSPM0G5187] [--image 镜像文件]
+
+检查项:
+    distribute     镜像分发到所有代理（相同内容不重复上传）
+    start          所有代理烧录完成，合并后的成功数 = 代理数 × 烧录器数
+    offline agent  不可连接的代理只记为该代理的错误，不影响其他代理
+    missing image  本地镜像不存在时每个代理返回错误，不抛出异常
+每个代理在独立的临时目录中运行，结束后删除。
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SIM_DIR)
+
+
+def sim_tool(name):
+    """替身工具路径（Windows下使用.cmd包装）"""
+    return os.path.join(SIM_DIR, f"{name}.cmd" if os.name == "nt" else f"{name}.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="多主机烧录本机验证（模拟dslite）")
+    parser.add_argument("--agents", type=int, default=3, help="代理节点数")
+    parser.add_argument("--probes", type=int, default=4, help="每个代理的模拟烧录器数")
+    parser.add_argument("--chip", default="MSPM0G5187", help="芯片型号")
+    parser.add_argument("--image", default=os.path.join(
+        REPO_DIR, "image", "gpio_toggle_output_LP_MSPM0G5187_nortos_ticlang.out"), help="镜像文件")
+    parser.add_argument("--timeout", type=float, default=60, help="等待烧录完成的超时时间（秒）")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def serve_agent(port):
+    """代理子进程：在当前目录中以代理模式运行app（工具替换为模拟程序）"""
+    sys.path.insert(0, REPO_DIR)
+    import app  # noqa: E402  在工作目录中导入，生成文件写入临时目录
+
+    app.DSLITE_PATH = sim_tool("fake_dslite")
+    app.XDSDFU_PATH = sim_tool("fake_xdsdfu")
+    app.MAX_FLASH_COUNT = 10 ** 9
+    ok, _, message = app.scan_devices()
+    if not ok:
+        print(f"模拟扫描失败: {message}", file=sys.stderr)
+        return 1
+    app.app.run(host="127.0.0.1", port=port, threaded=True)
+    return 0
+
+
+def start_agents(args):
+    """启动代理子进程，返回 [(进程, 地址, 工作目录)]"""
+    agents = []
+    for _ in range(args.agents):
+        workdir = tempfile.mkdtemp(prefix="uniflash-agent-")
+        for name in os.listdir(REPO_DIR):
+            if name.endswith(".ccxml"):
+                shutil.copy(os.path.join(REPO_DIR, name), workdir)
+        os.makedirs(os.path.join(workdir, "image"))
+        port = free_port()
+        env = dict(os.environ, FAKE_XDSDFU_PROBES=str(args.probes), FAKE_XDSDFU_LATENCY="0",
+                   FAKE_DSLITE_CONNECT="0.2", FAKE_DSLITE_ERASE="0.1", FAKE_DSLITE_PROGRAM="0.2",
+                   FAKE_DSLITE_VERIFY="0.1", FAKE_DSLITE_FAIL_RATE="0")
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", str(port)],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        agents.append((process, f"http://127.0.0.1:{port}", workdir))
+
+    # 等待代理开始监听
+    deadline = time.time() + 30
+    for process, url, _ in agents:
+        while True:
+            try:
+                urllib.request.urlopen(f"{url}/api/status", timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f"代理 {url} 启动失败")
+                time.sleep(0.2)
+    return agents
+
+
+def main():
+    args = parse_args()
+    if args.serve:
+        return serve_agent(args.serve)
+
+    sys.path.insert(0, REPO_DIR)
+    import cluster  # noqa: E402
+    import image_cache  # noqa: E402
+
+    sha256 = image_cache.compute_image_metadata(args.image)["sha256"]
+    agents = start_agents(args)
+    urls = [url for _, url, _ in agents]
+    coordinator = cluster.Coordinator(urls)
+    checks = []
+
+    def check(name, passed, detail=""):
+        checks.append(passed)
+        print(f"[{'PASS' if passed else 'FAIL'}] {name}{f': {detail}' if detail else ''}")
+
+    try:
+        errors = coordinator.distribute_image(args.image, sha256)
+        check("distribute", not errors, str(errors) if errors else "")
+
+        errors = coordinator.start_all(args.image, sha256, args.chip, False)
+        check("start", not errors, str(errors) if errors else "")
+        deadline = time.time() + args.timeout
+        while True:
+            status = coordinator.merged_status()
+            if not status["is_running"] or time.time() > deadline:
+                break
+            time.sleep(0.2)
+        expected = args.agents * args.probes
+        check("flash", status["total_success"] == expected and not status["is_running"],
+              f"成功 {status['total_success']}/{expected}，失败 {status['total_fail']}")
+
+        coordinator.set_agents(urls + [f"http://127.0.0.1:{free_port()}"])
+        status = coordinator.merged_status()
+        offline = [agent for agent in status["agents"] if not agent["online"]]
+        check("offline agent", len(offline) == 1 and status["num_channels"] == expected,
+              f"离线 {len(offline)} 个，通道 {status['num_channels']}")
+        coordinator.set_agents(urls)
+
+        errors = coordinator.distribute_image(os.path.join(REPO_DIR, "image", "missing.out"), "0" * 64)
+        check("missing image", len(errors) == args.agents, f"{len(errors)} 个代理返回错误")
+    finally:
+        coordinator.stop_all()
+        for process, _, workdir in agents:
+            process.terminate()
+            process.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return 0 if all(checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
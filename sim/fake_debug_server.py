@@ -0,0 +1,103 @@
+"""
+常驻调试会话的本地替身进程（协议见 probe_session.py）
+
+用法: python sim/fake_debug_server.py <ccxml文件> [--startup 秒] [--program 秒] [--fail-rate 0~1]
+
+启动时模拟一次调试器配置和连接，之后每条命令只输出对应阶段的进度行。
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+
+def emit(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def emit_sections(image, step_delay):
+    emit("\tPreparing ... ")
+    for name, size, addr, percent in ((".text", 4, 0x80000, None),
+                                      (".data", 1828, 0x80008, None),
+                                      (".text", 10484, 0x80470, 17),
+                                      (".data", 36, 0x818f0, 99)):
+        time.sleep(step_delay)
+        suffix = f": {percent}%" if percent is not None else ""
+        emit(f"\t{name}: 0 of {size} at 0x{addr:x}{suffix}")
+    emit("\tFinished: 99%")
+
+
+def handle(request, args):
+    cmd = request.get("cmd")
+    image = request.get("image") or ""
+    options = request.get("options") or {}
+    step_delay = args.program / 8.0
+
+    if cmd == "ping":
+        return True, "pong"
+
+    if random.random() < args.fail_rate:
+        emit("Error connecting to the target: (Error -1170) Unable to access the DAP.")
+        return False, "target not responding"
+
+    if cmd == "reset":
+        emit("Resetting target")
+        return True, ""
+
+    if cmd in ("erase", "program") and (cmd == "erase" or options.get("erase", True)):
+        emit("Erasing Flash")
+        for bank in range(5):
+            time.sleep(step_delay / 2)
+            emit(f"\tErasing Bank {bank}: {bank * 20}%" if bank else "\tErasing Bank 0")
+        if cmd == "erase":
+            return True, ""
+
+    if cmd == "program":
+        emit(f"Loading Program: {image}")
+        emit_sections(image, step_delay)
+        if not options.get("verify", True):
+            return True, ""
+
+    if cmd in ("program", "verify"):
+        emit(f"Verifying Program: {image}")
+        emit_sections(image, step_delay)
+        emit(f"info: CPU: Program verification successful for {image}")
+        return True, ""
+
+    return False, f"unknown command: {cmd}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ccxml")
+    parser.add_argument("--startup", type=float, default=1.0)
+    parser.add_argument("--program", type=float, default=1.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    emit("DSLite version (simulated)")
+    emit("Configuring Debugger (may take a few minutes on first launch)...")
+    time.sleep(args.startup / 2)
+    emit("\tInitializing Register Database...")
+    emit("Connecting...")
+    time.sleep(args.startup / 2)
+    emit("@@READY")
+
+    for raw in sys.stdin:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            request = json.loads(raw)
+        except ValueError:
+            continue
+        ok, message = handle(request, args)
+        if ok:
+            emit("Success")
+        emit("@@RESULT " + json.dumps({"id": request.get("id"), "ok": ok, "message": message}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+dslite的本地替身（无需TI硬件），按真实dslite的输出格式回放烧录过程
+
+用法与dslite相同，例如:
+    fake_dslite.py flash -c xxx.ccxml -e -f -v image.out
+    fake_dslite.py noConnectFlash -c xxx.ccxml -O AutomaticFactoryReset
+    fake_dslite.py flash -c xxx.ccxml -b AutomaticFactoryReset -e -f -v image.out
+
+将app.py中的DSLITE_PATH指向本脚本（Windows下指向fake_dslite.cmd）即可。
+耗时与失败率通过环境变量配置（秒，按 ±FAKE_DSLITE_JITTER 比例随机波动）:
+    FAKE_DSLITE_CONNECT     调试器配置+连接耗时，默认1.0
+    FAKE_DSLITE_ERASE       擦除耗时，默认0.5
+    FAKE_DSLITE_PROGRAM     写入耗时，默认1.0
+    FAKE_DSLITE_VERIFY      校验耗时，默认0.5
+    FAKE_DSLITE_JITTER      随机波动比例，默认0.1
+    FAKE_DSLITE_FAIL_RATE   随机失败概率（0~1），默认0
+    FAKE_DSLITE_FAILURE     失败类型: connect / probe / verify / locked，默认随机
+    FAKE_DSLITE_STATE_DIR   保存各烧录器芯片状态的目录（可选）。设置后按序列号记录已写入的镜像和锁定状态：
+                            MSP加密烧录（擦除NONMAIN）后芯片锁定，之后的烧录报"device is locked"，
+                            直到执行AutomaticFactoryReset；仅校验（flash -v）时与已写入的镜像比较
+                            （未设置时视为全新芯片，仅校验总是不一致）
+    FAKE_DSLITE_LOCKED_RATE 设置状态目录时，首次出现的芯片处于锁定状态的概率，默认0
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+
+# C28x（F28P55）与Cortex-M0+（MSPM0）的输出模板，取自实际dslite输出
+_TARGETS = {
+    "C28x": {
+        "version": "DSLite version 20.2.0.3756",
+        "init": ["IcePick_C_0", "C28xx_CPU1", "CPU1_CLA1", "JLM"],
+        "gel": ["C28xx_CPU1: GEL Output: ",
+                "Memory Map Initialization Complete",
+                "C28xx_CPU1: GEL Output: ... DCSM Initialization Start ... ",
+                "C28xx_CPU1: GEL Output: ... DCSM Initialization Done ..."],
+        "cpu": "C28xx_CPU1",
+        "sections": [(".text", 4, 0x80000, None), (".data", 1828, 0x80008, None),
+                     (".text", 410, 0x803a0, 14), (".text", 10484, 0x80470, 17),
+                     (".data", 36, 0x818f0, 99), (".data", 16, 0x81908, 99)],
+        "banks": 5,
+    },
+    "ARM": {
+        "version": "DSLite version 20.4.0.3973",
+        "init": ["CS_DAP_0", "CORTEX_M0P", "SEC_AP"],
+        "gel": ["CORTEX_M0P: GEL Output: Memory Map Initialization Complete"],
+        "cpu": "CORTEX_M0P",
+        "sections": [("PT_LOAD[0]", 520, 0x0, None), ("PT_LOAD[2]", 184, 0x41c00000, 65),
+                     ("PT_LOAD[3]", 96, 0x41c00100, 88)],
+        "banks": 0,
+    },
+}
+
+_FAILURES = {
+    "connect": "Error connecting to the target: (Error -1170) Unable to access the DAP.",
+    "probe": "Failed: Cannot connect to the debug probe. The XDS110 with the requested serial number was not found.",
+    "verify": "Failed: File: {image}: Verification failed: Values at address 0x80470 do not match.",
+    "locked": "Failed: Unknown error",
+}
+
+
+def emit(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def delay(name, default):
+    base = float(os.environ.get(f"FAKE_DSLITE_{name}", default))
+    jitter = float(os.environ.get("FAKE_DSLITE_JITTER", 0.1))
+    time.sleep(max(0.0, base * (1 + random.uniform(-jitter, jitter))))
+
+
+def parse_args(argv):
+    """解析dslite命令行（只处理本程序用到的参数）"""
+    opts = {"command": None, "ccxml": None, "erase": False, "flash": False, "verify": False,
+            "operations": [], "before": [], "after": [], "settings": [], "image": None}
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ("-c", "--config") and i + 1 < len(argv):
+            opts["ccxml"] = argv[i + 1]
+            i += 1
+        elif arg.startswith("--config="):
+            opts["ccxml"] = arg.split("=", 1)[1]
+        elif arg in ("-O", "-a", "-b") and i + 1 < len(argv):
+            opts[{"-O": "operations", "-a": "after", "-b": "before"}[arg]].append(argv[i + 1])
+            i += 1
+        elif arg == "-s" and i + 1 < len(argv):
+            opts["settings"].append(argv[i + 1])
+            i += 1
+        elif arg == "-e":
+            opts["erase"] = True
+        elif arg == "-f":
+            opts["flash"] = True
+        elif arg == "-v":
+            opts["verify"] = True
+        elif opts["command"] is None:
+            opts["command"] = arg
+        else:
+            opts["image"] = arg
+        i += 1
+    return opts
+
+
+def read_ccxml(path):
+    """返回 (架构, 烧录器序列号)"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except (OSError, TypeError):
+        return "C28x", ""
+    arch = "ARM" if re.search(r"MSPM0|CORTEX_M", content) else "C28x"
+    tag = re.search(r'<[^>]*id="-- Enter the serial number"[^>]*>', content)
+    match = re.search(r'Value="([^"]*)"', tag.group(0)) if tag else None
+    return arch, match.group(1) if match else ""
+
+
+def image_identity(path):
+    try:
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    except (OSError, TypeError):
+        return None
+
+
+class ChipState:
+    """按烧录器序列号保存的芯片状态（未设置FAKE_DSLITE_STATE_DIR时不保存）"""
+
+    def __init__(self, serial):
+        directory = os.environ.get("FAKE_DSLITE_STATE_DIR")
+        self.path = os.path.join(directory, f"{serial or 'default'}.json") if directory else None
+        self.data = {"locked": False, "image": None}
+        if self.path and os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        elif self.path:
+            self.data["locked"] = random.random() < float(os.environ.get("FAKE_DSLITE_LOCKED_RATE", 0))
+
+    def save(self):
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f)
+
+
+def fail(kind, image=""):
+    emit(_FAILURES[kind].format(image=image))
+    return 1
+
+
+def emit_sections(target, finished=True):
+    emit("\tPreparing ... ")
+    last = 0
+    for name, size, addr, percent in target["sections"]:
+        suffix = f": {percent}%" if percent is not None else ""
+        emit(f"\t{name}: 0 of {size} at 0x{addr:x}{suffix}")
+        last = percent or last
+    if finished:
+        emit(f"\tFinished: {last}%")
+    return last
+
+
+def main():
+    opts = parse_args(sys.argv[1:])
+    arch, serial = read_ccxml(opts["ccxml"])
+    target = _TARGETS[arch]
+    state = ChipState(serial)
+    image = opts["image"] or ""
+
+    emit(target["version"])
+    emit("Configuring Debugger (may take a few minutes on first launch)...")
+    emit("\tInitializing Register Database...")
+    for core in target["init"]:
+        emit(f"\tInitializing: {core}")
+        emit(f"\tExecuting Startup Scripts: {core}")
+    delay("CONNECT", 1.0)
+
+    fail_rate = float(os.environ.get("FAKE_DSLITE_FAIL_RATE", 0))
+    failure = None
+    if random.random() < fail_rate:
+        failure = os.environ.get("FAKE_DSLITE_FAILURE") or random.choice(["connect", "probe", "verify", "locked"])
+    if failure == "probe":
+        return fail("probe")
+
+    emit("Connecting...")
+    if failure == "connect":
+        return fail("connect")
+    for line in target["gel"]:
+        emit(line)
+
+    # 工厂复位：擦除全部Flash并解除锁定（-O单独执行；-b在同一会话中复位后继续烧录）
+    if "AutomaticFactoryReset" in opts["operations"] + opts["before"]:
+        emit("Running Operation: AutomaticFactoryReset")
+        delay("ERASE", 0.5)
+        state.data = {"locked": False, "image": None}
+        state.save()
+        if "AutomaticFactoryReset" in opts["operations"]:
+            emit("Success")
+            return 0
+
+    if state.data["locked"] or failure == "locked":
+        return fail("locked")
+
+    for operation in opts["before"]:
+        if operation != "AutomaticFactoryReset":
+            emit(f"Running Operation: {operation}")
+
+    # 仅校验：与芯片中已写入的镜像比较
+    if opts["verify"] and not opts["erase"] and not opts["flash"]:
+        emit(f"Verifying Program: {image}")
+        delay("VERIFY", 0.5)
+        emit_sections(target)
+        if state.data["image"] != image_identity(image):
+            return fail("verify", image)
+        emit(f"info: {target['cpu']}: Program verification successful for {image}")
+        emit("Success")
+        return 0
+
+    emit(f"Loading Program: {image}")
+    if not image or not os.path.exists(image):
+        emit(f"Failed: File: {image}: No such file or directory")
+        return 1
+
+    if opts["erase"]:
+        if target["banks"]:
+            emit("Erasing Flash")
+            for bank in range(target["banks"]):
+                emit(f"\tErasing Bank {bank}: {bank * 20}%" if bank else "\tErasing Bank 0")
+        delay("ERASE", 0.5)
+
+    delay("PROGRAM", 1.0)
+    last = emit_sections(target)
+    emit(f"\tSetting PC to entry point.: {last}%")
+
+    if opts["verify"]:
+        emit(f"Verifying Program: {image}")
+        delay("VERIFY", 0.5)
+        emit_sections(target)
+        if failure == "verify":
+            return fail("verify", image)
+        emit(f"info: {target['cpu']}: Program verification successful for {image}")
+
+    for operation in opts["after"]:
+        emit(f"Running Operation: {operation}")
+
+    state.data["image"] = image_identity(image)
+    # MSP加密烧录会写入NONMAIN保护配置，之后芯片处于锁定状态
+    if any("NONMAIN" in setting for setting in opts["settings"]):
+        state.data["locked"] = True
+    state.save()
+
+    emit("Success")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+xdsdfu的本地替身（无需TI硬件），按真实xdsdfu -e的输出格式列出烧录器
+
+将app.py中的XDSDFU_PATH指向本脚本（Windows下指向fake_xdsdfu.cmd）即可。
+通过环境变量配置:
+    FAKE_XDSDFU_PROBES   烧录器数量，默认8（序列号为 SIM00001, SIM00002, ...）
+    FAKE_XDSDFU_SERIALS  逗号分隔的序列号列表（指定时忽略FAKE_XDSDFU_PROBES）
+    FAKE_XDSDFU_LATENCY  枚举耗时（秒），默认0.2
+"""
+import os
+import sys
+import time
+
+
+def main():
+    if "-e" not in sys.argv[1:]:
+        print("USAGE: xdsdfu -e")
+        return 1
+
+    serials = [s.strip() for s in os.environ.get("FAKE_XDSDFU_SERIALS", "").split(",") if s.strip()]
+    if not serials:
+        serials = [f"SIM{i:05d}" for i in range(1, int(os.environ.get("FAKE_XDSDFU_PROBES", 8)) + 1)]
+
+    time.sleep(float(os.environ.get("FAKE_XDSDFU_LATENCY", 0.2)))
+
+    print("USB Device Firmware Upgrade Utility")
+    print("Copyright (c) 2008-2019 Texas Instruments Incorporated.  All rights reserved.")
+    print()
+    print("Scanning USB buses for supported XDS110 devices...")
+    print()
+    for index, serial in enumerate(serials):
+        print()
+        print(f"<<<< Device {index} >>>>")
+        print()
+        print("VID: 0x0451    PID: 0xbef3")
+        print("Device Name:   XDS110 Embed with CMSIS-DAP")
+        print("Version:       3.0.0.22")
+        print("Manufacturer:  Texas Instruments")
+        print(f"Serial Num:    {serial}")
+        print("Mode:          Runtime")
+        print("Configuration: Standard")
+    print()
+    print(f"Found {len(serials)} device{'s' if len(serials) != 1 else ''}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import json
+import queue
+import threading
+
+# 订阅被移除时放入其队列的结束标记，推送流读到后应结束响应，让客户端重连
+CLOSED = object()
+
+
+def format_sse(event: str, data) -> str:
+    """
+    按Server-Sent Events格式编码一条事件
+    :param event: 事件名称
+    :param data: 事件数据（可JSON序列化）
+    :return: SSE文本
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class StatusBroadcaster:
+    """
+    状态推送广播器：每个订阅者持有一个有界队列，发布时向所有队列投递事件。
+    订阅者消费过慢导致队列满时会被移除：清空其队列并放入CLOSED，推送流随之结束，
+    前端EventSource自动重连后重新获取全量快照。
+    """
+
+    def __init__(self, max_queue_size=256):
+        self._max_queue_size = max_queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        """新增订阅者，返回其事件队列"""
+        q = queue.Queue(maxsize=self._max_queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        """移除订阅者"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscriber_count(self) -> int:
+        """当前订阅者数量"""
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: str, data):
+        """
+        向所有订阅者发布事件（只编码一次）
+        :param event: 事件名称
+        :param data: 事件数据
+        """
+        with self._lock:
+            if not self._subscribers:
+                return
+            subscribers = list(self._subscribers)
+
+        message = format_sse(event, data)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                self._drop(q)
+
+    def _drop(self, q: queue.Queue):
+        """移除消费过慢的订阅者，丢弃积压的事件并通知推送流结束"""
+        self.unsubscribe(q)
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            q.put_nowait(CLOSED)
+        except queue.Full:
+            pass
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import production_records  # noqa: E402
+
+
+class ImageStatsTest(unittest.TestCase):
+    """按镜像统计烧录次数：人工终止和中间重试不计入"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = production_records.RecordStore(os.path.join(self.tmpdir.name, "records.db"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def add(self, result, failure_class=None, timestamp=1.0, sha256="a" * 64):
+        self.store.add({"timestamp": timestamp, "image_sha256": sha256, "result": result,
+                        "failure_class": failure_class})
+
+    def test_cancelled_and_retry_runs_are_excluded(self):
+        self.add("success", timestamp=1.0)
+        self.add("skipped", timestamp=2.0)
+        self.add("failure", "target_not_responding", timestamp=3.0)
+        self.add("retry", "target_not_responding", timestamp=4.0)
+        self.add("failure", "cancelled", timestamp=5.0)
+        self.store.flush(5)
+
+        stats = self.store.image_stats()["a" * 64]
+        self.assertEqual(stats, {"flash_count": 3, "success_count": 2, "fail_count": 1, "last_flashed": 3.0})
+
+    def test_image_with_only_cancelled_runs_has_no_stats(self):
+        self.add("failure", "cancelled", sha256="b" * 64)
+        self.store.flush(5)
+        self.assertNotIn("b" * 64, self.store.image_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()